@@ -13,111 +13,255 @@ Options:
     --rows          Grid rows (default: 9)
     --output, -o    Output file (default: ~/.config/quickshell/widget_suggestions.json)
     --verbose, -v   Verbose output
+    --strategy      greedy or optimal widget placement (default: optimal)
+    --time-budget   Optimal placement search limit in ms (default: 200)
+    --no-cache      Decode and detect edges even if cached
+
+The decoded grayscale image and its Canny edge map are cached per image
+and decode level (see AnalysisCache), so re-analyzing the same wallpaper at
+another grid size or with other widgets skips decoding and edge detection.
 """
 
 import argparse
 import json
+import os
 import sys
+import tempfile
 from pathlib import Path
 
-# Add opencv-python to dependencies
 try:
-    import cv2
     import numpy as np
 except ImportError:
     print(
-        "Error: opencv-python required. Run: uv add opencv-python numpy",
+        "Error: numpy required. Run: uv add opencv-python numpy",
         file=sys.stderr,
     )
     sys.exit(1)
 
+from cache import ColorCache
+from decode import image_reduction_factor, imread_reduced
+from placement import DEFAULT_TIME_BUDGET, STRATEGIES, place_widgets, rect_means
+from timings import count, span
+
 DEFAULT_OUTPUT = Path.home() / ".config/quickshell/widget_suggestions.json"
 WIDGETS_FILE = Path.home() / ".config/quickshell/widgets.json"
 
+# Minimum decoded pixels per grid cell side; larger wallpapers are decoded
+# at 1/2, 1/4 or 1/8 scale down to this
+ANALYSIS_CELL_PX = 32
+
+# Cached gray image name: cvtColor of the color decode (older caches held
+# the decoder's own grayscale output, which differs)
+GRAY_NAME = "bgr2gray"
 
-def analyze_image(image_path: str, cols: int, rows: int) -> np.ndarray:
+# cv2.Canny hysteresis thresholds
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+
+def import_cv2():
     """
-    Analyze image and return a grid of "calmness" scores.
-    Lower score = calmer/more uniform area = better for widgets.
+    Import OpenCV on first use rather than at module load.
+
+    cv2 alone takes longer to import than the rest of the analysis, and is not
+    needed to parse arguments or validate paths.
+    """
+    try:
+        import cv2
+    except ImportError:
+        print(
+            "Error: opencv-python required. Run: uv add opencv-python numpy",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return cv2
+
+
+class AnalysisCache:
     """
-    # Load image
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError(f"Could not load image: {image_path}")
+    Decoded gray images and edge maps as .npy files, opened memory-mapped.
 
-    height, width = img.shape[:2]
-    cell_h = height // rows
-    cell_w = width // cols
+    Files live in the ColorCache analysis directory and count towards its
+    size limit (evict() removes the least recently used of both):
 
-    # Convert to grayscale for analysis
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        <hash>.r<factor>.bgr2gray.npy             grayscale at 1/factor scale
+        <hash>.r<factor>.canny<low>-<high>.npy    cv2.Canny edges of it
+    """
 
-    # Detect edges (busy areas have more edges)
-    edges = cv2.Canny(gray, 50, 150)
+    def __init__(self, colors: ColorCache | None = None):
+        self.colors = colors or ColorCache()
+        self.root = self.colors.analysis_dir
+
+    def key(self, image_path: str | Path, factor: int) -> str:
+        # Near-duplicates whose colors were copied share the original's maps
+        image_key = self.colors.canonical_key(self.colors.image_key(image_path))
+        return f"{image_key}.r{factor}"
+
+    def _path(self, key: str, name: str) -> Path:
+        return self.root / f"{key}.{name}.npy"
+
+    def load(self, key: str, name: str) -> np.ndarray | None:
+        """
+        Open a cached array read-only and mark it as recently used.
 
-    # Calculate scores for each grid cell
-    scores = np.zeros((rows, cols))
+        Returns:
+            Memory-mapped array, or None on miss
+        """
+        path = self._path(key, name)
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            count("cache.analysis.miss")
+            return None
+        count("cache.analysis.hit")
 
-    for r in range(rows):
-        for c in range(cols):
-            y1, y2 = r * cell_h, (r + 1) * cell_h
-            x1, x2 = c * cell_w, (c + 1) * cell_w
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return array
 
-            cell = gray[y1:y2, x1:x2]
-            cell_edges = edges[y1:y2, x1:x2]
+    def save(self, key: str, name: str, array: np.ndarray) -> None:
+        """Store an array (atomically, like write_json_atomic)."""
+        path = self._path(key, name)
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f".{path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except FileNotFoundError:
+                    pass
+                raise
+        except OSError as e:
+            print(f"Error writing analysis cache: {e}")
+
+    def evict(self) -> int:
+        return self.colors.evict()
+
+
+def analyze_image(
+    image_path: str, cols: int, rows: int, cache: AnalysisCache | None = None
+) -> np.ndarray:
+    """
+    Analyze image and return a grid of "calmness" scores.
+    Lower score = calmer/more uniform area = better for widgets.
 
-            # Score based on:
-            # 1. Variance (uniform areas have low variance)
-            variance = np.var(cell)
+    Args:
+        image_path: Path to the wallpaper
+        cols: Grid columns
+        rows: Grid rows
+        cache: Reuse/store the decoded gray image and edge map (None: no caching)
+    """
+    cv2 = import_cv2()
 
-            # 2. Edge density (calm areas have fewer edges)
-            edge_density = np.sum(cell_edges > 0) / cell_edges.size
+    # Decode at the smallest reduced size that still gives every grid cell
+    # ANALYSIS_CELL_PX pixels per side
+    factor = image_reduction_factor(
+        image_path, cols * ANALYSIS_CELL_PX, rows * ANALYSIS_CELL_PX
+    )
+    edges_name = f"canny{CANNY_LOW}-{CANNY_HIGH}"
+
+    key = gray = edges = None
+    if cache is not None:
+        key = cache.key(image_path, factor)
+        gray = cache.load(key, GRAY_NAME)
+        if gray is not None:
+            edges = cache.load(key, edges_name)
+
+    if gray is None:
+        with span("analyze.decode"):
+            img = imread_reduced(
+                image_path,
+                cols * ANALYSIS_CELL_PX,
+                rows * ANALYSIS_CELL_PX,
+                factor=factor,
+            )
+        if img is None:
+            raise ValueError(f"Could not load image: {image_path}")
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if cache is not None:
+            cache.save(key, GRAY_NAME, gray)
 
-            # Combined score (lower = better for widgets)
-            scores[r, c] = variance * 0.3 + edge_density * 1000 * 0.7
+    if edges is None:
+        with span("analyze.edges"):
+            edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
+        if cache is not None:
+            cache.save(key, edges_name, edges)
+            cache.evict()
 
-    return scores
+    return score_grid(gray, cols, rows, edges)
 
 
-def find_best_position(
-    scores: np.ndarray, width: int, height: int, exclude: list = None
-) -> tuple:
+def score_grid(
+    gray: np.ndarray, cols: int, rows: int, edges: np.ndarray | None = None
+) -> np.ndarray:
     """
-    Find the best position for a widget of given size.
-    Returns (gridX, gridY) or None if no valid position.
+    Calmness scores of an already decoded grayscale image.
+
+    Args:
+        gray: (H, W) uint8 grayscale image
+        cols: Grid columns
+        rows: Grid rows
+        edges: cv2.Canny edge map of gray, if already computed
+
+    Returns:
+        (rows, cols) array, lower = calmer
     """
-    rows, cols = scores.shape
-    exclude = exclude or []
+    height, width = gray.shape[:2]
+    cell_h = height // rows
+    cell_w = width // cols
+    if cell_h == 0 or cell_w == 0:
+        raise ValueError(f"Image too small for a {cols}x{rows} grid ({width}x{height})")
+
+    cv2 = import_cv2()
+
+    # Detect edges (busy areas have more edges)
+    if edges is None:
+        with span("analyze.edges"):
+            edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
 
-    best_score = float("inf")
-    best_pos = None
+    # Summed-area tables: every cell's sum, sum of squares and edge count
+    # is then four lookups, whatever the cell size
+    with span("analyze.integral"):
+        gray_sum, gray_sqsum = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        edge_sum = cv2.integral((edges > 0).astype(np.uint8), sdepth=cv2.CV_64F)
 
-    for r in range(rows - height + 1):
-        for c in range(cols - width + 1):
-            # Check if overlaps with excluded regions
-            overlaps = False
-            for ex in exclude:
-                ex_x, ex_y, ex_w, ex_h = ex
-                if not (
-                    c + width <= ex_x
-                    or c >= ex_x + ex_w
-                    or r + height <= ex_y
-                    or r >= ex_y + ex_h
-                ):
-                    overlaps = True
-                    break
+    ys = np.arange(rows + 1) * cell_h
+    xs = np.arange(cols + 1) * cell_w
+    n = cell_h * cell_w
 
-            if overlaps:
-                continue
+    cell_mean = cell_sums(gray_sum, ys, xs) / n
 
-            # Calculate average score for this region
-            region_score = np.mean(scores[r : r + height, c : c + width])
+    # Score based on:
+    # 1. Variance (uniform areas have low variance)
+    variance = np.maximum(cell_sums(gray_sqsum, ys, xs) / n - cell_mean**2, 0.0)
 
-            if region_score < best_score:
-                best_score = region_score
-                best_pos = (c, r)
+    # 2. Edge density (calm areas have fewer edges)
+    edge_density = cell_sums(edge_sum, ys, xs) / n
 
-    return best_pos
+    # Combined score (lower = better for widgets)
+    return variance * 0.3 + edge_density * 1000 * 0.7
+
+
+def cell_sums(table: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """
+    Sum of every grid cell from a summed-area table.
+
+    Args:
+        table: (H+1, W+1) integral image
+        ys: Row boundaries (rows + 1 values)
+        xs: Column boundaries (cols + 1 values)
+
+    Returns:
+        (rows, cols) array of cell sums
+    """
+    corners = table[np.ix_(ys, xs)]
+    return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
 
 
 def load_existing_widgets() -> list:
@@ -132,14 +276,39 @@ def load_existing_widgets() -> list:
 
 
 def suggest_widgets(
-    image_path: str, cols: int, rows: int, verbose: bool = False
+    image_path: str,
+    cols: int,
+    rows: int,
+    verbose: bool = False,
+    strategy: str = "optimal",
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    cache: AnalysisCache | None = None,
 ) -> list:
     """
     Analyze image and suggest widget placements.
     Preserves existing widget sizes from widgets.json.
+
+    Args:
+        image_path: Path to the wallpaper
+        cols: Grid columns
+        rows: Grid rows
+        verbose: Print the score grid and placement warnings
+        strategy: "greedy" (one widget at a time, in widgets.json order) or
+            "optimal" (all widgets together, minimizing the total score)
+        time_budget: Seconds the optimal search may take
+        cache: Analysis cache (see analyze_image)
     """
-    scores = analyze_image(image_path, cols, rows)
+    scores = analyze_image(image_path, cols, rows, cache)
+    return place_suggestions(scores, verbose, strategy, time_budget)
+
 
+def place_suggestions(
+    scores: np.ndarray,
+    verbose: bool = False,
+    strategy: str = "optimal",
+    time_budget: float = DEFAULT_TIME_BUDGET,
+) -> list:
+    """Place the widgets from widgets.json (or defaults) on a score grid."""
     if verbose:
         print("Grid scores (lower = calmer):")
         for r in range(scores.shape[0]):
@@ -150,9 +319,6 @@ def suggest_widgets(
     existing = load_existing_widgets()
     existing_by_type = {w.get("type"): w for w in existing}
 
-    widgets = []
-    exclude = []
-
     # Default widget definitions if not in existing: (type, preferred_width, preferred_height)
     default_sizes = {
         "clock": (6, 3),
@@ -171,6 +337,7 @@ def suggest_widgets(
         if wtype not in widget_types:
             widget_types.append(wtype)
 
+    sizes = []
     for wtype in widget_types:
         # Get size from existing widget or use default
         if wtype in existing_by_type:
@@ -182,8 +349,13 @@ def suggest_widgets(
             )
         else:
             w, h = default_sizes.get(wtype, (4, 3))
+        sizes.append((w, h))
 
-        pos = find_best_position(scores, w, h, exclude)
+    with span("analyze.place"):
+        positions = place_widgets(scores, sizes, strategy, time_budget)
+
+    widgets = []
+    for wtype, (w, h), pos in zip(widget_types, sizes, positions):
         if pos:
             gx, gy = pos
             widgets.append(
@@ -193,16 +365,57 @@ def suggest_widgets(
                     "gridY": gy,
                     "gridWidth": w,
                     "gridHeight": h,
-                    "reason": f"score: {np.mean(scores[gy : gy + h, gx : gx + w]):.1f}",
+                    "reason": f"score: {rect_means(scores, w, h)[gy, gx]:.1f}",
                 }
             )
-            exclude.append((gx, gy, w, h))
         elif verbose:
             print(f"Warning: Could not place {wtype} widget")
 
     return widgets
 
 
+def write_suggestions(
+    widgets: list,
+    image_path: str,
+    cols: int,
+    rows: int,
+    output: str | Path = DEFAULT_OUTPUT,
+) -> Path:
+    """Write suggestions JSON for the widget editor; returns the output path."""
+    output_path = Path(output).expanduser()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    output_data = {
+        "image": image_path,
+        "grid": {"cols": cols, "rows": rows},
+        "widgets": widgets,
+    }
+
+    with open(output_path, "w") as f:
+        json.dump(output_data, f, indent=2)
+    return output_path
+
+
+def apply_suggestions(widgets: list) -> None:
+    """Replace widgets.json with the suggested placements."""
+    widgets_data = []
+    for i, w in enumerate(widgets):
+        widgets_data.append(
+            {
+                "id": f"w{i + 1}",
+                "type": w["type"],
+                "gridX": w["gridX"],
+                "gridY": w["gridY"],
+                "gridWidth": w["gridWidth"],
+                "gridHeight": w["gridHeight"],
+                "title": w["type"].capitalize(),
+            }
+        )
+
+    with open(WIDGETS_FILE, "w") as f:
+        json.dump(widgets_data, f)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Analyze wallpaper for smart widget placement",
@@ -216,11 +429,28 @@ def main():
         "-o", "--output", default=str(DEFAULT_OUTPUT), help="Output JSON file"
     )
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
+    parser.add_argument(
+        "--strategy",
+        choices=STRATEGIES,
+        default="optimal",
+        help="Placement strategy (default: optimal)",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=DEFAULT_TIME_BUDGET * 1000,
+        help="Optimal search time limit in ms (default: %(default)g)",
+    )
     parser.add_argument(
         "--apply",
         action="store_true",
         help="Apply suggestions directly to widgets.json",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the analysis cache",
+    )
 
     args = parser.parse_args()
 
@@ -235,45 +465,27 @@ def main():
         print(f"Grid: {args.cols}x{args.rows}")
 
     try:
-        widgets = suggest_widgets(str(image_path), args.cols, args.rows, args.verbose)
+        widgets = suggest_widgets(
+            str(image_path),
+            args.cols,
+            args.rows,
+            args.verbose,
+            args.strategy,
+            args.time_budget / 1000,
+            None if args.no_cache else AnalysisCache(),
+        )
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Write output
-    output_path = Path(args.output).expanduser()
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    output_data = {
-        "image": str(image_path),
-        "grid": {"cols": args.cols, "rows": args.rows},
-        "widgets": widgets,
-    }
-
-    with open(output_path, "w") as f:
-        json.dump(output_data, f, indent=2)
-
+    output_path = write_suggestions(
+        widgets, str(image_path), args.cols, args.rows, args.output
+    )
     print(f"Wrote suggestions to: {output_path}")
 
     # Apply directly to widgets.json if requested
     if args.apply:
-        widgets_data = []
-        for i, w in enumerate(widgets):
-            widgets_data.append(
-                {
-                    "id": f"w{i + 1}",
-                    "type": w["type"],
-                    "gridX": w["gridX"],
-                    "gridY": w["gridY"],
-                    "gridWidth": w["gridWidth"],
-                    "gridHeight": w["gridHeight"],
-                    "title": w["type"].capitalize(),
-                }
-            )
-
-        with open(WIDGETS_FILE, "w") as f:
-            json.dump(widgets_data, f)
-
+        apply_suggestions(widgets)
         print(f"Applied to: {WIDGETS_FILE}")
 
     for w in widgets:
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+decode.py - Peak RSS and decode time of full vs reduced-resolution decoding
+
+Each measurement runs in a fresh child process. The child resets its RSS
+high-water mark after importing (/proc/self/clear_refs), so the reported
+peak is the resident import baseline plus the decode.
+
+Usage:
+    uv run bench/decode.py [image ...] [--repeat N]
+
+Methods: seed-full is the original Image.open().convert().thumbnail(),
+seed is decode.load_thumbnail (the same full decode without the converted
+copy), analyze-* decode for the default 16x9 grid.
+
+Without arguments synthetic 8K JPEG and PNG wallpapers are generated.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+COL_GEN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(COL_GEN_DIR))
+
+METHODS = ["seed-full", "seed", "analyze-full", "analyze-reduced"]
+
+
+def make_inputs(out_dir: Path) -> list[Path]:
+    """Write a deterministic 7680x4320 wallpaper as JPEG and PNG."""
+    import numpy as np
+    from PIL import Image
+
+    h, w = 4320, 7680
+    yy, xx = np.mgrid[0:h, 0:w]
+    img = np.stack(
+        [
+            (xx * 255 // w).astype(np.uint8),
+            (yy * 255 // h).astype(np.uint8),
+            ((xx + yy) % 256).astype(np.uint8),
+        ],
+        axis=-1,
+    )
+    paths = [out_dir / "8k.jpg", out_dir / "8k.png"]
+    Image.fromarray(img).save(paths[0], quality=90)
+    Image.fromarray(img).save(paths[1], compress_level=1)
+    return paths
+
+
+def run_child(method: str, image: Path) -> None:
+    """Decode once with the given method and print elapsed seconds and peak RSS."""
+    import cv2
+    from PIL import Image
+
+    from analyze import ANALYSIS_CELL_PX
+    from decode import imread_reduced, load_thumbnail
+
+    try:
+        # Reset VmHWM to the current RSS so import-time spikes are not counted
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+    t = time.perf_counter()
+    if method == "seed-full":
+        img = Image.open(image).convert("RGB")
+        img.thumbnail((128, 128))
+    elif method == "seed":
+        load_thumbnail(image, 128)
+    elif method == "analyze-full":
+        cv2.cvtColor(cv2.imread(str(image)), cv2.COLOR_BGR2GRAY)
+    elif method == "analyze-reduced":
+        img = imread_reduced(image, 16 * ANALYSIS_CELL_PX, 9 * ANALYSIS_CELL_PX)
+        cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    elapsed = time.perf_counter() - t
+    print(elapsed, peak_rss_mib())
+
+
+def peak_rss_mib() -> float:
+    """VmHWM of the current process in MiB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(method: str, image: Path) -> tuple[float, float]:
+    """Return (decode seconds, peak RSS in MiB) for one child run."""
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--child", method, str(image)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    out, _ = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{method} failed on {image}")
+    elapsed, rss = out.split()
+    return float(elapsed), float(rss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time and peak RSS benchmark")
+    parser.add_argument("images", nargs="*", help="Images to decode")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    parser.add_argument("--child", nargs=2, metavar=("METHOD", "IMAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], Path(args.child[1]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = [Path(p) for p in args.images] or make_inputs(Path(tmp))
+
+        print(f"{'image':<16} {'method':<16} {'decode ms':>10} {'peak RSS MiB':>13}")
+        for image in images:
+            for method in METHODS:
+                runs = [measure(method, image) for _ in range(args.repeat)]
+                decode_ms = min(r[0] for r in runs) * 1000
+                rss = min(r[1] for r in runs)
+                print(f"{image.name:<16} {method:<16} {decode_ms:10.1f} {rss:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+seed_regression.py - Check the NumPy seed pipeline against the original one
+
+Runs the original extraction end to end (Image.open().convert() ->
+thumbnail -> list(getdata()) -> list-of-lists -> QuantizeCelebi ->
+Score.score) and the current one (decode.load_thumbnail -> NumPy pixels ->
+QuantizeCelebi -> scoring.score_colors) on every image, reports any
+difference and the per-stage timings of both paths.
+
+Both paths should build the same thumbnail, so any difference is
+reported. A differing candidate list counts as drift while the two seeds
+are within --tolerance (CAM16-UCS distance, default REFINE_THRESHOLD) and
+as a mismatch beyond it; every differing image is listed with its
+distance. The synthetic corpus includes 1920x1080 JPEGs of each image,
+where a reduced draft() decode would move noisy and hard-edged seeds
+beyond the tolerance.
+
+Usage:
+    uv run bench/seed_regression.py [dir_or_image ...] [--repeat N] [--tolerance D]
+
+Without arguments a deterministic synthetic corpus is generated.
+Exits with status 1 if any image mismatches.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from materialyoucolor.quantize import QuantizeCelebi
+from materialyoucolor.score.score import Score
+from PIL import Image
+
+from colors import REFINE_THRESHOLD, argb_to_hex, extract_seed_candidates, seed_distance
+from decode import load_thumbnail
+from scoring import score_colors
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def synthetic_corpus(out_dir: Path, count: int = 24) -> list[Path]:
+    """Write deterministic test wallpapers covering noise, gradients and flat palettes."""
+    rng = np.random.default_rng(1234)
+    paths = []
+    h, w = 270, 480
+    yy, xx = np.mgrid[0:h, 0:w]
+
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        elif kind == 1:
+            base = rng.integers(0, 256, 3)
+            tint = rng.integers(0, 256, 3)
+            t = (xx / w)[..., None]
+            img = (base * (1 - t) + tint * t).astype(np.uint8)
+        elif kind == 2:
+            palette = rng.integers(0, 256, (6, 3), dtype=np.uint8)
+            blocks = rng.integers(0, 6, (9, 16))
+            img = palette[np.kron(blocks, np.ones((30, 30), dtype=int))]
+        else:
+            # Near-monochrome: exercises the low-threshold scorer passes
+            gray = rng.integers(40, 70, (h, w), dtype=np.uint8)
+            img = np.stack([gray, gray + 2, gray + 5], axis=-1)
+
+        path = out_dir / f"synthetic-{i:02d}.png"
+        Image.fromarray(img).save(path)
+        paths.append(path)
+
+        # The same content as a JPEG large enough for a reduced draft() decode,
+        # which would change its seed
+        path = out_dir / f"synthetic-{i:02d}.jpg"
+        Image.fromarray(img).resize((1920, 1080), Image.Resampling.BICUBIC).save(path)
+        paths.append(path)
+
+    return paths
+
+
+def collect_images(targets: list[str]) -> list[Path]:
+    images = []
+    for target in targets:
+        path = Path(target).expanduser()
+        if path.is_dir():
+            images.extend(
+                sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+            )
+        elif path.exists():
+            images.append(path)
+    return images
+
+
+def reference_candidates(image_path: Path, timings: dict) -> list[int]:
+    """The original extract_seed_color pipeline."""
+    t = time.perf_counter()
+    img = Image.open(image_path).convert("RGB")
+    img.thumbnail((128, 128))
+    timings["decode"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    rgb_pixels = [[r, g, b] for r, g, b in list(img.getdata())]
+    timings["pixels"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    quantized = QuantizeCelebi(rgb_pixels, 128)
+    timings["quantize"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    scored = Score.score(quantized)
+    timings["score"] += time.perf_counter() - t
+    return scored
+
+
+def numpy_candidates(image_path: Path, timings: dict) -> list[int]:
+    """Same stages as colors.extract_seed_candidates, timed individually."""
+    t = time.perf_counter()
+    img = load_thumbnail(image_path)
+    timings["decode"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    rgb_pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 3).tolist()
+    timings["pixels"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    quantized = QuantizeCelebi(rgb_pixels, 128)
+    timings["quantize"] += time.perf_counter() - t
+
+    t = time.perf_counter()
+    scored = score_colors(quantized)
+    timings["score"] += time.perf_counter() - t
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed extraction regression check")
+    parser.add_argument("targets", nargs="*", help="Images or directories")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=REFINE_THRESHOLD,
+        help="Largest seed distance counted as drift, not a mismatch (default: %(default)g)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = collect_images(args.targets) if args.targets else synthetic_corpus(Path(tmp))
+        if not images:
+            print("Error: no images found", file=sys.stderr)
+            sys.exit(1)
+
+        ref_t = {"decode": 0.0, "pixels": 0.0, "quantize": 0.0, "score": 0.0}
+        new_t = {"decode": 0.0, "pixels": 0.0, "quantize": 0.0, "score": 0.0}
+        mismatches = 0
+        drifts = 0
+        distances = []
+
+        for image in images:
+            expected = reference_candidates(image, ref_t)
+            actual = numpy_candidates(image, new_t)
+            shipped = extract_seed_candidates(image)
+            if shipped != actual:
+                # The timed stages no longer match colors.py
+                mismatches += 1
+                print(f"MISMATCH {image}: extract_seed_candidates {shipped} != {actual}")
+            elif expected != actual:
+                if not expected or not actual:
+                    mismatches += 1
+                    print(f"MISMATCH {image}: {expected} != {actual}")
+                    continue
+                distance = seed_distance(expected[0], actual[0])
+                distances.append(distance)
+                if distance <= args.tolerance:
+                    label = "DRIFT"
+                    drifts += 1
+                else:
+                    label = "MISMATCH"
+                    mismatches += 1
+                print(
+                    f"{label} {image}: seed {argb_to_hex(expected[0])} -> "
+                    f"{argb_to_hex(actual[0])} (distance {distance:.2f})"
+                )
+            for _ in range(args.repeat - 1):
+                reference_candidates(image, ref_t)
+                numpy_candidates(image, new_t)
+
+    runs = len(images) * args.repeat
+    summary = f"{len(images)} images, {mismatches} mismatches, {drifts} drifted"
+    if distances:
+        summary += f" (max seed distance {max(distances):.2f}, tolerance {args.tolerance:g})"
+    print(summary)
+    print(f"{'stage':<10} {'original ms':>12} {'numpy ms':>10}")
+    for stage in ref_t:
+        print(f"{stage:<10} {ref_t[stage] / runs * 1000:12.2f} {new_t[stage] / runs * 1000:10.2f}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
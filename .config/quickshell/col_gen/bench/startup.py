@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+startup.py - Cold-start import cost of the col_gen entry points
+
+Imports each entry module in a fresh interpreter with -X importtime and
+compares the cumulative import time against bench/startup_budget.json. The
+budget also lists heavy packages an entry point must not pull in at import
+time (they belong to the stage that uses them).
+
+Usage:
+    uv run bench/startup.py [--repeat N] [--update]
+
+Each entry point is imported --repeat times and the median run is
+compared, so single slow or fast runs (disk cache, scheduler) do not
+decide the result. Budgets are that median times BUDGET_HEADROOM, rounded
+up to 10 ms, as written by --update; re-baseline with it after intended
+import changes rather than editing single values.
+
+Exits with status 1 if any entry point is over budget or imports a
+forbidden package. --update rewrites the budgets from this machine's
+timings, keeping the forbidden lists.
+"""
+
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+COL_GEN_DIR = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+# --update sets each budget to this multiple of the median time; import
+# times of the same tree vary by about 1.5x between runs on a busy machine
+BUDGET_HEADROOM = 2.0
+
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        (cumulative import time of module in ms, top-level packages imported)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=COL_GEN_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    total_us = 0
+    packages = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative_us = int(cumulative)
+        except ValueError:
+            # Header line
+            continue
+        packages.add(name.strip().split(".")[0])
+        if name == f" {module}":
+            total_us = cumulative_us
+    return total_us / 1000, packages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point")
+    parser.add_argument(
+        "--update", action="store_true", help="Rewrite budgets from these timings"
+    )
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE) as f:
+        budgets = json.load(f)
+
+    failed = False
+    print(f"{'module':<12} {'import ms':>10} {'budget ms':>10}  status")
+    for module, budget in budgets.items():
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        elapsed = statistics.median(ms for ms, _ in runs)
+        leaked = sorted(set(budget.get("forbidden", [])) & runs[0][1])
+
+        if args.update:
+            budget["budget_ms"] = math.ceil(elapsed * BUDGET_HEADROOM / 10) * 10
+
+        status = "ok"
+        if elapsed > budget["budget_ms"]:
+            status = "OVER BUDGET"
+        if leaked:
+            status = f"imports {', '.join(leaked)}"
+        if status != "ok":
+            failed = True
+
+        print(f"{module:<12} {elapsed:10.1f} {budget['budget_ms']:10}  {status}")
+
+    if args.update:
+        with open(BUDGET_FILE, "w") as f:
+            json.dump(budgets, f, indent=2)
+            f.write("\n")
+        print(f"Updated {BUDGET_FILE}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+suite.py - End-to-end col_gen benchmark with baseline comparison
+
+Benchmarks every stage of a theme switch on deterministic generated
+wallpapers (1080p/4K/8K, JPEG/PNG/WebP):
+
+    seed.<res>.<fmt>             extract_seed_color
+    scheme.<name>                generate_scheme_from_seed, dark, per SCHEME_MAP entry
+    templates.render             render_all
+    templates.write.changed      write_outputs into a temp HOME, all files new
+    templates.write.unchanged    write_outputs with identical content
+    hooks                        run_hooks, shell commands with stub binaries on PATH
+    hooks.native                 run_hooks, native backends against a fake Hyprland
+                                 socket and dummy processes
+    analyze.<res>.<cols>x<rows>  analyze_image
+    analyze.cached.<res>         analyze_image, 16x9, decode and edges from AnalysisCache
+    suggest.<res>.<cols>x<rows>  suggest_widgets
+
+Before timing anything the native hook backends are checked against the
+fake desktop (check_native_hooks): the socket must receive reload, only
+the dummy named like the hook may get SIGUSR2, and a backend raising
+NativeUnavailable must fall back to its shell command.
+
+HOME, XDG_CACHE_HOME and XDG_RUNTIME_DIR point at a temp directory for the
+whole run, hyprctl/gsettings/pkill/... are stubs, GSettings uses its memory
+backend and native signal hooks only target the suite's own dummy
+processes, so the real desktop is never touched.
+
+Usage:
+    uv run bench/suite.py [-o results.json] [--baseline old.json]
+                          [--threshold 0.25] [--filter seed.] [--sizes 1080p,4k]
+
+Exits with status 1 if a native hook check fails, or if any benchmark's
+best time is more than threshold (relative) and --min-delta-ms (absolute)
+slower than in the baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import signal
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+COL_GEN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(COL_GEN_DIR))
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+FORMATS = {"jpg": {"quality": 90}, "png": {"compress_level": 1}, "webp": {"quality": 90}}
+GRIDS = [(16, 9), (32, 18), (64, 36)]
+
+# Binaries the hooks call; replaced by no-op scripts
+STUB_BINARIES = ["hyprctl", "gsettings", "pkill", "ghostty", "waybar"]
+
+# Instance signature of the fake Hyprland socket
+FAKE_HYPRLAND_SIGNATURE = "col_gen_bench"
+
+
+def make_wallpaper(path: Path, width: int, height: int, seed: int) -> None:
+    """Write a deterministic wallpaper: smooth gradient sky plus busy noisy blobs."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    img = np.empty((height, width, 3), dtype=np.float32)
+    for c in range(3):
+        a, b = rng.uniform(20, 230, 2)
+        img[..., c] = a + (b - a) * (0.6 * yy / height + 0.4 * xx / width)
+
+    # Textured regions give the edge detector and quantizer something to do
+    for _ in range(6):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        radius = rng.uniform(0.05, 0.2) * width
+        mask = (xx - cx) ** 2 + (yy - cy) ** 2 < radius**2
+        color = rng.uniform(0, 255, 3).astype(np.float32)
+        img[mask] = color
+    img += rng.normal(0, 6, img.shape[:2])[..., None].astype(np.float32)
+
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(
+        path, **FORMATS[path.suffix[1:]]
+    )
+
+
+def make_corpus(out_dir: Path, sizes: list[str]) -> dict[tuple[str, str], Path]:
+    """Generate (or reuse) one wallpaper per resolution and format."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    corpus = {}
+    for i, res in enumerate(sizes):
+        width, height = RESOLUTIONS[res]
+        for fmt in FORMATS:
+            path = out_dir / f"{res}.{fmt}"
+            if not path.exists():
+                make_wallpaper(path, width, height, seed=i)
+            corpus[(res, fmt)] = path
+    return corpus
+
+
+def make_stubs(bin_dir: Path) -> None:
+    """Create no-op stand-ins for the binaries hooks run."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name in STUB_BINARIES:
+        stub = bin_dir / name
+        stub.write_text("#!/bin/sh\nexit 0\n")
+        stub.chmod(0o755)
+
+
+class _HyprlandHandler(socketserver.BaseRequestHandler):
+    """Record each request and answer it like Hyprland answers reload."""
+
+    def handle(self):
+        self.server.requests.append(self.request.recv(8192).decode())
+        self.request.sendall(b"ok")
+
+
+# Dummy process: renames itself, then appends a line to its log per SIGUSR2
+_DUMMY_SCRIPT = """
+import signal, sys, time
+name, log = sys.argv[1:]
+def record(signum, frame):
+    with open(log, "a") as f:
+        f.write("SIGUSR2\\n")
+signal.signal(signal.SIGUSR2, record)
+with open("/proc/self/comm", "w") as f:
+    f.write(name)
+while True:
+    time.sleep(3600)
+"""
+
+
+class FakeDesktop:
+    """What fake_desktop() received: Hyprland requests and signals per dummy."""
+
+    def __init__(self, requests: list[str], logs: dict[str, Path]):
+        self.requests = requests
+        self.logs = logs
+
+    def signals(self, name: str) -> int:
+        """Number of SIGUSR2 the dummy called name has handled so far."""
+        try:
+            return len(self.logs[name].read_text().splitlines())
+        except FileNotFoundError:
+            return 0
+
+
+@contextmanager
+def fake_desktop(runtime_dir: Path, process_names: list[str]):
+    """
+    Serve a fake Hyprland socket under runtime_dir and run one idle
+    process per name that logs the SIGUSR2s it receives, for the native
+    hook backends. Yields a FakeDesktop.
+    """
+    socket_dir = runtime_dir / "hypr" / FAKE_HYPRLAND_SIGNATURE
+    socket_dir.mkdir(parents=True, exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(
+        str(socket_dir / ".socket.sock"), _HyprlandHandler
+    )
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    logs = {name: runtime_dir / f"{name}.signals" for name in process_names}
+    dummies = [
+        subprocess.Popen([sys.executable, "-c", _DUMMY_SCRIPT, name, str(logs[name])])
+        for name in process_names
+    ]
+    try:
+        # Wait until the dummies have renamed themselves
+        for proc, name in zip(dummies, process_names):
+            comm = Path(f"/proc/{proc.pid}/comm")
+            while comm.read_text().strip() != name[:15]:
+                time.sleep(0.01)
+        yield FakeDesktop(server.requests, logs)
+    finally:
+        for proc in dummies:
+            proc.kill()
+            proc.wait()
+        server.shutdown()
+        server.server_close()
+
+
+def check_native_hooks(desktop: FakeDesktop) -> list[str]:
+    """
+    Check the native hook backends against fake_desktop(): the Hyprland
+    backend sends reload, signal backends reach exactly the processes of
+    that name, and NativeUnavailable falls back to the shell command.
+
+    Returns:
+        Descriptions of the failed checks
+    """
+    from hooks import HOOKS, Hook, NativeUnavailable, run_hook, signal_processes
+
+    failures = []
+
+    hyprland = next(hook for hook in HOOKS if hook.name == "hyprland")
+    result = run_hook(hyprland, "dark")
+    if (result.status, result.backend) != ("ok", "native"):
+        failures.append(f"hyprland hook: {result.status} via {result.backend} ({result.reason})")
+    if desktop.requests[-1:] != ["reload"]:
+        failures.append(f"fake Hyprland socket received {desktop.requests!r}, expected reload")
+
+    before = {name: desktop.signals(name) for name in desktop.logs}
+    signalled = signal_processes("cg-waybar", signal.SIGUSR2)
+    if signalled != 1:
+        failures.append(f"signal_processes('cg-waybar') signalled {signalled}, expected 1")
+    expected = {name: before[name] + (name == "cg-waybar") for name in desktop.logs}
+    # Wait for the expected signal, then a little longer for stray ones
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline:
+        if all(desktop.signals(name) >= count for name, count in expected.items()):
+            break
+        time.sleep(0.01)
+    time.sleep(0.2)
+    received = {name: desktop.signals(name) for name in desktop.logs}
+    if received != expected:
+        failures.append(f"dummies received {received} SIGUSR2, expected {expected}")
+
+    def unavailable(mode: str, timeout: float) -> str:
+        raise NativeUnavailable("not in this environment")
+
+    fallback = Hook("fallback", "echo shell-{mode}", None, (), 2.0, unavailable)
+    result = run_hook(fallback, "dark")
+    if (result.status, result.backend, result.stdout.strip()) != ("ok", "shell", "shell-dark"):
+        failures.append(
+            f"NativeUnavailable fallback: {result.status} via {result.backend} "
+            f"(stdout {result.stdout.strip()!r})"
+        )
+
+    return failures
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """Time fn() repeat times after warmup calls."""
+    for _ in range(warmup):
+        fn()
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "runs": len(runs),
+    }
+
+
+def benchmarks(corpus: dict, sizes: list[str]):
+    """Yield (name, callable) for every benchmark."""
+    from analyze import AnalysisCache, analyze_image, suggest_widgets
+    from colors import SCHEME_MAP, extract_seed_color, generate_scheme_from_seed
+    from hooks import HOOKS, run_hooks, signal_backend
+    from templates import TEMPLATE_OUTPUTS, expand_path, render_all, write_outputs
+
+    for (res, fmt), path in corpus.items():
+        yield f"seed.{res}.{fmt}", lambda path=path: extract_seed_color(path)
+
+    seed = extract_seed_color(corpus[(sizes[0], "jpg")])
+    for scheme_type in SCHEME_MAP:
+        yield (
+            f"scheme.{scheme_type}",
+            lambda scheme_type=scheme_type: generate_scheme_from_seed(
+                seed, "dark", scheme_type
+            ),
+        )
+
+    image = str(corpus[(sizes[0], "jpg")])
+    colors = generate_scheme_from_seed(seed)
+    rendered = render_all(colors, image, "dark")
+    yield "templates.render", lambda: render_all(colors, image, "dark")
+
+    def write_changed():
+        for paths in TEMPLATE_OUTPUTS.values():
+            for output in paths:
+                expand_path(output).unlink(missing_ok=True)
+        write_outputs(rendered)
+
+    yield "templates.write.changed", write_changed
+    yield "templates.write.unchanged", lambda: write_outputs(rendered)
+    yield "hooks", lambda: run_hooks("dark", native=False)
+
+    # Signal hooks aimed at the dummy processes of fake_desktop()
+    native_hooks = [
+        hook._replace(native=partial(signal_backend, f"cg-{hook.name}", signal.SIGUSR2))
+        if hook.name in ("ghostty", "waybar")
+        else hook
+        for hook in HOOKS
+    ]
+    yield "hooks.native", lambda: run_hooks("dark", hooks=native_hooks)
+
+    for res in sizes:
+        path = str(corpus[(res, "jpg")])
+        for cols, rows in GRIDS:
+            yield (
+                f"analyze.{res}.{cols}x{rows}",
+                lambda path=path, cols=cols, rows=rows: analyze_image(path, cols, rows),
+            )
+            yield (
+                f"suggest.{res}.{cols}x{rows}",
+                lambda path=path, cols=cols, rows=rows: suggest_widgets(path, cols, rows),
+            )
+        # The warmup run fills the cache
+        yield (
+            f"analyze.cached.{res}",
+            lambda path=path: analyze_image(path, 16, 9, AnalysisCache()),
+        )
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float, min_delta_ms: float
+) -> list[str]:
+    """Return descriptions of benchmarks that regressed against baseline."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        delta = result["min_ms"] - old["min_ms"]
+        if delta > min_delta_ms and result["min_ms"] > old["min_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {old['min_ms']:.1f} -> {result['min_ms']:.1f} ms "
+                f"(+{delta / old['min_ms'] * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="col_gen benchmark suite")
+    parser.add_argument("-o", "--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown vs baseline (default: 0.25)",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Ignore slowdowns smaller than this (default: 1.0)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this")
+    parser.add_argument(
+        "--sizes",
+        default="1080p,4k,8k",
+        help="Comma-separated resolutions (default: 1080p,4k,8k)",
+    )
+    parser.add_argument(
+        "--corpus",
+        help="Directory to keep generated wallpapers in between runs (default: temp)",
+    )
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in RESOLUTIONS]
+    if unknown:
+        print(f"Error: Unknown size(s): {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="col_gen_bench.") as tmp:
+        tmp = Path(tmp)
+        # Isolate everything the code under test writes or runs
+        os.environ["HOME"] = str(tmp / "home")
+        os.environ["XDG_CACHE_HOME"] = str(tmp / "cache")
+        os.environ["XDG_RUNTIME_DIR"] = str(tmp / "run")
+        os.environ["HYPRLAND_INSTANCE_SIGNATURE"] = FAKE_HYPRLAND_SIGNATURE
+        os.environ["GSETTINGS_BACKEND"] = "memory"
+        make_stubs(tmp / "bin")
+        os.environ["PATH"] = f"{tmp / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}"
+
+        corpus_dir = Path(args.corpus).expanduser() if args.corpus else tmp / "corpus"
+        print(f"Generating corpus in {corpus_dir} ...", flush=True)
+        corpus = make_corpus(corpus_dir, sizes)
+
+        results = {}
+        # cg-waybar-old shares a prefix with cg-waybar and must never be signalled
+        with fake_desktop(tmp / "run", ["cg-ghostty", "cg-waybar", "cg-waybar-old"]) as desktop:
+            failures = check_native_hooks(desktop)
+            if failures:
+                print("Native hook checks failed:", file=sys.stderr)
+                for line in failures:
+                    print(f"  {line}", file=sys.stderr)
+                return 1
+
+            for name, fn in benchmarks(corpus, sizes):
+                if args.filter not in name:
+                    continue
+                results[name] = measure(fn, args.repeat)
+                print(
+                    f"{name:<32} {results[name]['min_ms']:10.2f} ms "
+                    f"(median {results[name]['median_ms']:.2f})",
+                    flush=True,
+                )
+
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Wrote results to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
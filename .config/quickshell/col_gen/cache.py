@@ -0,0 +1,294 @@
+"""
+On-disk cache of seed colors and generated schemes, keyed by image content.
+
+Layout under $XDG_CACHE_HOME/col_gen:
+    paths.json          path -> [mtime_ns, size, hash] pre-check index
+    signatures.json     hash -> [dhash, r, g, b] near-duplicate index (see dedup.py)
+    entries/<hash>.json {"seed": int, "candidates": [int],
+                         "schemes": {scheme_key: {role: argb}},
+                         "duplicate_of": hash (seed copied from a near-duplicate)}
+    analysis/<hash>.*.npy
+                        decoded gray and edge maps (see analyze.AnalysisCache)
+
+Entries and analysis files are evicted least-recently-used first once
+together they grow past max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from dedup import DUPLICATE_THRESHOLD, signature_distance
+from timings import count, span
+
+# Shared by entries (a few KiB each) and analysis maps (~1 MiB per 4K image)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Read size when hashing image files
+_HASH_CHUNK = 1024 * 1024
+
+
+def cache_dir() -> Path:
+    """Return the col_gen cache directory ($XDG_CACHE_HOME/col_gen)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / "col_gen"
+
+
+def scheme_key(mode: str, scheme_type: str, contrast: float) -> str:
+    """Key for one generated scheme inside a cache entry."""
+    return f"{mode}:{scheme_type}:{float(contrast):g}"
+
+
+def hash_file(path: str | Path) -> str:
+    """Content hash of a file (blake2b, 128 bit, hex)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: Path, data) -> None:
+    """Write JSON through a temp file + os.replace so readers never see partial data."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ColorCache:
+    """Content-addressed store of seeds, scored candidates and color dicts."""
+
+    def __init__(self, root: str | Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root else cache_dir()
+        self.entries_dir = self.root / "entries"
+        self.analysis_dir = self.root / "analysis"
+        self.max_bytes = max_bytes
+        self._paths: dict | None = None
+        self._paths_dirty = False
+        self._signatures: dict | None = None
+        self._signatures_dirty = False
+
+    # -- path pre-check index -------------------------------------------------
+
+    def _load_paths(self) -> dict:
+        if self._paths is None:
+            try:
+                with open(self.root / "paths.json") as f:
+                    self._paths = json.load(f)
+            except (OSError, ValueError):
+                self._paths = {}
+        return self._paths
+
+    def _save_paths(self) -> None:
+        if self._paths_dirty and self._paths is not None:
+            try:
+                write_json_atomic(self.root / "paths.json", self._paths)
+            except OSError as e:
+                print(f"Error writing cache index: {e}")
+            self._paths_dirty = False
+
+    def image_key(self, image_path: str | Path) -> str:
+        """
+        Content hash for an image, skipping the read when mtime and size match.
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            Hex content hash
+        """
+        path = str(Path(image_path).resolve())
+        st = os.stat(path)
+
+        known = self._load_paths().get(path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            count("cache.path.hit")
+            return known[2]
+        count("cache.path.miss")
+
+        with span("cache.hash"):
+            digest = hash_file(path)
+        self.record_path(path, st.st_mtime_ns, st.st_size, digest)
+        self.flush()
+        return digest
+
+    def record_path(self, path: str, mtime_ns: int, size: int, digest: str) -> None:
+        """Remember a path's content hash; call flush() to persist."""
+        self._load_paths()[path] = [mtime_ns, size, digest]
+        self._paths_dirty = True
+
+    def flush(self) -> None:
+        """Persist pending path and signature index changes."""
+        self._save_paths()
+        self._save_signatures()
+
+    # -- near-duplicate index -------------------------------------------------
+
+    def _load_signatures(self) -> dict:
+        if self._signatures is None:
+            try:
+                with open(self.root / "signatures.json") as f:
+                    self._signatures = json.load(f)
+            except (OSError, ValueError):
+                self._signatures = {}
+        return self._signatures
+
+    def _save_signatures(self) -> None:
+        if self._signatures_dirty and self._signatures is not None:
+            try:
+                write_json_atomic(self.root / "signatures.json", self._signatures)
+            except OSError as e:
+                print(f"Error writing cache index: {e}")
+            self._signatures_dirty = False
+
+    def record_signature(self, key: str, signature: list[int]) -> None:
+        """Remember an image's dedup.image_signature(); call flush() to persist."""
+        self._load_signatures()[key] = signature
+        self._signatures_dirty = True
+
+    def find_duplicate(
+        self, key: str, signature: list[int], threshold: int = DUPLICATE_THRESHOLD
+    ) -> str | None:
+        """
+        Closest cached near-duplicate of an image.
+
+        Args:
+            key: The image's own content hash (never returned)
+            signature: Its dedup.image_signature()
+            threshold: Maximum differing dhash bits
+
+        Returns:
+            Content hash of a near-duplicate that has a cache entry, or None
+        """
+        best = None
+        for other, other_signature in self._load_signatures().items():
+            if other == key:
+                continue
+            distance = signature_distance(signature, other_signature)
+            if distance is None or distance > threshold:
+                continue
+            if best is None or distance < best[0]:
+                if self._entry_path(other).exists():
+                    best = (distance, other)
+        return best[1] if best else None
+
+    def canonical_key(self, key: str) -> str:
+        """The image an entry's seed was copied from, or key itself."""
+        try:
+            with open(self._entry_path(key)) as f:
+                return json.load(f).get("duplicate_of", key)
+        except (OSError, ValueError):
+            return key
+
+    # -- entries ----------------------------------------------------------------
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        """
+        Load a cache entry and mark it as recently used.
+
+        Returns:
+            Entry dict, or None on miss
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            count("cache.entry.miss")
+            return None
+        count("cache.entry.hit")
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: dict, evict: bool = True) -> None:
+        """
+        Store a cache entry.
+
+        Args:
+            key: Image content hash
+            entry: Entry dict
+            evict: Evict old entries if over the size limit (bulk writers
+                pass False and call evict() once at the end)
+        """
+        try:
+            write_json_atomic(self._entry_path(key), entry)
+        except OSError as e:
+            print(f"Error writing cache entry: {e}")
+            return
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries and analysis files until under
+        max_bytes.
+
+        Returns:
+            Number of files removed
+        """
+        try:
+            files = [
+                (st.st_mtime_ns, st.st_size, p)
+                for p in [
+                    *self.entries_dir.glob("*.json"),
+                    *self.analysis_dir.glob("*.npy"),
+                ]
+                if (st := p.stat())
+            ]
+        except OSError:
+            return 0
+
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        removed_entries = set()
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            if path.suffix == ".json":
+                removed_entries.add(path.stem)
+
+        # Drop pre-check and signature rows pointing at evicted entries
+        paths = self._load_paths()
+        stale = [p for p, row in paths.items() if row[2] in removed_entries]
+        for p in stale:
+            del paths[p]
+        if stale:
+            self._paths_dirty = True
+            self._save_paths()
+
+        signatures = self._load_signatures()
+        stale = [key for key in signatures if key in removed_entries]
+        for key in stale:
+            del signatures[key]
+        if stale:
+            self._signatures_dirty = True
+            self._save_signatures()
+
+        return removed
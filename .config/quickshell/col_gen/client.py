@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+client.py - Forward a col_gen command line to a running `main.py serve`
+
+Only uses the standard library, so it starts in a few milliseconds with any
+system python3 and without uv or the heavy color/template dependencies.
+
+Usage:
+    python3 client.py image|apply|mode|preview|search|duplicates [args]
+
+Exits with EX_TEMPFAIL (75) when no daemon is reachable or the command is
+not one the daemon handles, so wrapper scripts can fall back to running
+main.py in-process. Once the request is sent the daemon may have started
+running it, so a timeout or a daemon dying mid-request exits with 1
+instead: falling back would run the command (and its hooks) twice.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+from runlock import SINGLE_FLIGHT_COMMANDS, take_ticket
+
+EX_TEMPFAIL = 75
+
+# Subcommands the daemon answers; everything else runs in-process
+FORWARDED_COMMANDS = {"image", "apply", "mode", "preview", "search", "duplicates"}
+
+# Seconds to wait for a reply (hooks alone may take up to 10s each)
+TIMEOUT = 60.0
+
+
+def socket_path() -> Path:
+    """Return the daemon socket path ($COL_GEN_SOCKET overrides the default)."""
+    override = os.environ.get("COL_GEN_SOCKET")
+    if override:
+        return Path(override)
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "col_gen.sock"
+    return Path(tempfile.gettempdir()) / f"col_gen-{os.getuid()}.sock"
+
+
+def forward(argv: list[str], path: str | Path | None = None) -> int | None:
+    """
+    Send a command line to the daemon and relay its output.
+
+    Args:
+        argv: Arguments as they would be passed to main.py
+        path: Socket path (default: socket_path())
+
+    Returns:
+        The command's exit code, 1 if the daemon failed after receiving the
+        request, or None if it could not handle it (not running, or not a
+        forwarded command)
+    """
+    if not argv or argv[0] not in FORWARDED_COMMANDS:
+        return None
+
+    # Take the ticket now, not when the daemon gets to this request, so a
+    # request queued behind others already supersedes them
+    if argv[0] in SINGLE_FLIGHT_COMMANDS:
+        argv = [*argv, "--ticket", str(take_ticket())]
+
+    path = Path(path) if path else socket_path()
+    request = json.dumps({"argv": argv, "cwd": os.getcwd()}) + "\n"
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return None
+
+        chunks = []
+        try:
+            sock.sendall(request.encode())
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b"\n"):
+                    break
+        except OSError as e:
+            print(f"Error: no reply from col_gen daemon: {e}", file=sys.stderr)
+            return 1
+
+    try:
+        reply = json.loads(b"".join(chunks))
+    except ValueError:
+        print("Error: col_gen daemon closed the connection without a reply", file=sys.stderr)
+        return 1
+
+    if reply.get("stdout"):
+        sys.stdout.write(reply["stdout"])
+    if reply.get("stderr"):
+        sys.stderr.write(reply["stderr"])
+
+    return int(reply.get("code", 1))
+
+
+def main() -> int:
+    code = forward(sys.argv[1:])
+    return EX_TEMPFAIL if code is None else code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,47 +2,160 @@
 MD3 color generation from images using materialyoucolor.
 """
 
+import importlib
+from collections.abc import Mapping
 from pathlib import Path
-from materialyoucolor.quantize import QuantizeCelebi
-from materialyoucolor.hct import Hct
-from materialyoucolor.score.score import Score
-from materialyoucolor.dynamiccolor.material_dynamic_colors import MaterialDynamicColors
-from materialyoucolor.scheme.scheme_tonal_spot import SchemeTonalSpot
-from materialyoucolor.scheme.scheme_expressive import SchemeExpressive
-from materialyoucolor.scheme.scheme_fidelity import SchemeFidelity
-from materialyoucolor.scheme.scheme_fruit_salad import SchemeFruitSalad
-from materialyoucolor.scheme.scheme_monochrome import SchemeMonochrome
-from materialyoucolor.scheme.scheme_neutral import SchemeNeutral
-from materialyoucolor.scheme.scheme_rainbow import SchemeRainbow
-from materialyoucolor.scheme.scheme_vibrant import SchemeVibrant
-from materialyoucolor.scheme.scheme_content import SchemeContent
-from PIL import Image
-
-SCHEME_MAP = {
-    "tonal-spot": SchemeTonalSpot,
-    "expressive": SchemeExpressive,
-    "fidelity": SchemeFidelity,
-    "fruit-salad": SchemeFruitSalad,
-    "monochrome": SchemeMonochrome,
-    "neutral": SchemeNeutral,
-    "rainbow": SchemeRainbow,
-    "vibrant": SchemeVibrant,
-    "content": SchemeContent,
+from typing import TYPE_CHECKING
+
+from cache import ColorCache, scheme_key
+from timings import count, span
+
+# numpy, PIL and materialyoucolor are imported by the functions that need
+# them, so parsing arguments or answering from the cache stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+
+# Scheme name -> (module in materialyoucolor.scheme, class name)
+SCHEME_CLASSES = {
+    "tonal-spot": ("scheme_tonal_spot", "SchemeTonalSpot"),
+    "expressive": ("scheme_expressive", "SchemeExpressive"),
+    "fidelity": ("scheme_fidelity", "SchemeFidelity"),
+    "fruit-salad": ("scheme_fruit_salad", "SchemeFruitSalad"),
+    "monochrome": ("scheme_monochrome", "SchemeMonochrome"),
+    "neutral": ("scheme_neutral", "SchemeNeutral"),
+    "rainbow": ("scheme_rainbow", "SchemeRainbow"),
+    "vibrant": ("scheme_vibrant", "SchemeVibrant"),
+    "content": ("scheme_content", "SchemeContent"),
 }
 
 
+class _SchemeMap(Mapping):
+    """Scheme name -> scheme class, importing each class on first lookup."""
+
+    def __init__(self, classes: dict[str, tuple[str, str]]):
+        self._classes = classes
+        self._loaded: dict[str, type] = {}
+
+    def __getitem__(self, name: str) -> type:
+        if name not in self._loaded:
+            module_name, class_name = self._classes[name]
+            module = importlib.import_module(f"materialyoucolor.scheme.{module_name}")
+            self._loaded[name] = getattr(module, class_name)
+        return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._classes)
+
+    def __len__(self) -> int:
+        return len(self._classes)
+
+
+SCHEME_MAP = _SchemeMap(SCHEME_CLASSES)
+
+
+FALLBACK_SEED = 0xFF4285F4  # Google blue
+
+
+SEED_THUMBNAIL_SIZE = 128
+
+# Thumbnail for the provisional seed of progressive generation
+PROVISIONAL_THUMBNAIL_SIZE = 32
+
+# Refined seeds closer than this CAM16-UCS distance to the provisional one
+# are not re-applied (about 2-5 for typical wallpapers)
+REFINE_THRESHOLD = 5.0
+
+
+def seed_candidates_from_pixels(pixels: "np.ndarray") -> list[int]:
+    """Quantize and score an (H, W, 3) or (N, 3) uint8 RGB array (or PIL image)."""
+    import numpy as np
+    from materialyoucolor.quantize import QuantizeCelebi
+
+    from scoring import score_colors
+
+    # (N, 3) uint8 -> list of [R, G, B] lists in one C-level pass.
+    # Pixel order is kept: the quantizer's k-means init depends on it.
+    with span("seed.pixels"):
+        rgb_pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3).tolist()
+    with span("seed.quantize"):
+        quantized = QuantizeCelebi(rgb_pixels, 128)
+    with span("seed.score"):
+        return score_colors(quantized)
+
+
+def extract_seed_candidates(
+    image_path: str | Path, size: int = SEED_THUMBNAIL_SIZE
+) -> list[int]:
+    """Extract scored candidate colors (ARGB ints, best first) from a size px thumbnail."""
+    from decode import load_thumbnail
+
+    # Decode straight to a thumbnail for quantization
+    with span("seed.decode"):
+        img = load_thumbnail(image_path, size)
+    return seed_candidates_from_pixels(img)
+
+
+def seed_thumbnail(image_path: str | Path, pixels: "np.ndarray | None" = None):
+    """The SEED_THUMBNAIL_SIZE RGB PIL thumbnail seeds are quantized from."""
+    from decode import load_thumbnail, thumbnail_from_array
+
+    if pixels is not None:
+        with span("seed.thumbnail"):
+            return thumbnail_from_array(pixels, SEED_THUMBNAIL_SIZE)
+    with span("seed.decode"):
+        return load_thumbnail(image_path, SEED_THUMBNAIL_SIZE)
+
+
+def copy_duplicate_seed(entry: dict, cache: ColorCache, key: str, img) -> bool:
+    """
+    Fill a seedless cache entry from a cached near-duplicate image.
+
+    Records the image's signature (see dedup.py) either way. On a match the
+    near-duplicate's seed, candidates and generated schemes are copied into
+    entry, which is marked "duplicate_of" it.
+
+    Args:
+        entry: Cache entry of the image, without "seed"
+        cache: ColorCache holding the near-duplicate index
+        key: Content hash of the image
+        img: Its seed thumbnail (seed_thumbnail)
+
+    Returns:
+        True if entry was filled
+    """
+    from dedup import image_signature
+
+    with span("seed.signature"):
+        signature = image_signature(img)
+        cache.record_signature(key, signature)
+        duplicate = cache.find_duplicate(key, signature)
+    cache.flush()
+
+    source = cache.get(duplicate) if duplicate else None
+    if not source or "seed" not in source:
+        return False
+    count("cache.duplicate.hit")
+
+    entry["seed"] = source["seed"]
+    entry["candidates"] = source.get("candidates", [source["seed"]])
+    entry["duplicate_of"] = source.get("duplicate_of", duplicate)
+    schemes = entry.setdefault("schemes", {})
+    for skey, colors in source.get("schemes", {}).items():
+        schemes.setdefault(skey, colors)
+    return True
+
+
+def seed_distance(a: int, b: int) -> float:
+    """Perceptual distance between two ARGB colors (CAM16-UCS, the space behind HCT)."""
+    from materialyoucolor.hct.cam16 import Cam16
+
+    return Cam16.from_int(a).distance(Cam16.from_int(b))
+
+
 def extract_seed_color(image_path: str | Path) -> int:
     """Extract dominant seed color (ARGB int) from image."""
-    img = Image.open(image_path).convert("RGB")
-    # Resize for faster quantization
-    img.thumbnail((128, 128))
-    pixels = list(img.getdata())
-    # Convert to list of [R, G, B] lists
-    rgb_pixels = [[r, g, b] for r, g, b in pixels]
-    # Quantize and score
-    quantized = QuantizeCelebi(rgb_pixels, 128)
-    scored = Score.score(quantized)
-    return scored[0] if scored else 0xFF4285F4  # fallback to Google blue
+    scored = extract_seed_candidates(image_path)
+    return scored[0] if scored else FALLBACK_SEED
 
 
 def argb_to_hex(argb: int) -> str:
@@ -61,11 +174,162 @@ def argb_to_hex_stripped(argb: int) -> str:
     return f"{r:02x}{g:02x}{b:02x}"
 
 
+class _memoized:
+    """Read-only attribute computed on first access and kept in slot _<name>."""
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.__doc__ = compute.__doc__
+
+    def __set_name__(self, owner, name):
+        self.slot = getattr(owner, f"_{name}")
+
+    def __get__(self, role, owner=None):
+        if role is None:
+            return self
+        try:
+            return self.slot.__get__(role, owner)
+        except AttributeError:
+            value = self.compute(role)
+            self.slot.__set__(role, value)
+            return value
+
+
+class ColorRole:
+    """
+    One scheme color. Formats are computed on first access and memoized, so
+    a run only pays for the formats its templates use:
+
+        {{ colors.primary.hex }}           #rrggbb
+        {{ colors.primary.hex_stripped }}  rrggbb
+        {{ colors.primary.rgb }}           rgb(r, g, b)
+        {{ colors.primary.rgba }}          rgba(r, g, b, 1)
+        {{ colors.primary.hsl }}           hsl(h, s%, l%)
+        {{ colors.primary.hct }}           hct(hue, chroma, tone)
+
+    The same formats are Jinja filters (see COLOR_FILTERS), where rgba takes
+    an alpha: {{ colors.primary | rgba(0.8) }}. role["hex"] still works for
+    code written against the old {"hex", "hex_stripped"} dicts.
+    """
+
+    __slots__ = ("argb", "_hex", "_hex_stripped", "_rgb", "_rgba", "_hsl", "_hct")
+
+    def __init__(self, argb: int):
+        self.argb = argb
+
+    @classmethod
+    def coerce(cls, value: "ColorRole | int | str") -> "ColorRole":
+        """A ColorRole for a role, an ARGB int or a "#rrggbb" string."""
+        if isinstance(value, ColorRole):
+            return value
+        if isinstance(value, str):
+            return cls(0xFF000000 | int(value.strip().removeprefix("#"), 16))
+        return cls(value)
+
+    @property
+    def red(self) -> int:
+        return (self.argb >> 16) & 0xFF
+
+    @property
+    def green(self) -> int:
+        return (self.argb >> 8) & 0xFF
+
+    @property
+    def blue(self) -> int:
+        return self.argb & 0xFF
+
+    @_memoized
+    def hex(self) -> str:
+        return argb_to_hex(self.argb)
+
+    @_memoized
+    def hex_stripped(self) -> str:
+        return argb_to_hex_stripped(self.argb)
+
+    @_memoized
+    def rgb(self) -> str:
+        return f"rgb({self.red}, {self.green}, {self.blue})"
+
+    @_memoized
+    def rgba(self) -> str:
+        return self.with_alpha(1.0)
+
+    @_memoized
+    def hsl(self) -> str:
+        import colorsys
+
+        h, l, s = colorsys.rgb_to_hls(self.red / 255, self.green / 255, self.blue / 255)
+        return f"hsl({round(h * 360) % 360}, {round(s * 100)}%, {round(l * 100)}%)"
+
+    @_memoized
+    def hct(self) -> str:
+        from materialyoucolor.hct import Hct
+
+        hct = Hct.from_int(self.argb)
+        return f"hct({round(hct.hue)}, {round(hct.chroma)}, {round(hct.tone)})"
+
+    def with_alpha(self, alpha: float) -> str:
+        """rgba() with the given alpha (0.0 - 1.0)."""
+        return f"rgba({self.red}, {self.green}, {self.blue}, {float(alpha):g})"
+
+    def __getitem__(self, name: str) -> str:
+        if name not in COLOR_FILTERS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __str__(self) -> str:
+        return self.hex
+
+    def __repr__(self) -> str:
+        return f"ColorRole({self.hex})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ColorRole):
+            return self.argb == other.argb
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.argb)
+
+
+# Jinja filters: {{ colors.primary | rgb }}, {{ value | rgba(0.5) }}; they
+# also accept ARGB ints and "#rrggbb" strings
+COLOR_FILTERS = {
+    "hex": lambda value: ColorRole.coerce(value).hex,
+    "hex_stripped": lambda value: ColorRole.coerce(value).hex_stripped,
+    "rgb": lambda value: ColorRole.coerce(value).rgb,
+    "rgba": lambda value, alpha=1.0: ColorRole.coerce(value).with_alpha(alpha),
+    "hsl": lambda value: ColorRole.coerce(value).hsl,
+    "hct": lambda value: ColorRole.coerce(value).hct,
+}
+
+
+def scheme_colors(stored: Mapping) -> dict[str, ColorRole]:
+    """
+    Color dict of a scheme stored in the cache.
+
+    Args:
+        stored: Role name -> ARGB int, or -> {"hex", ...} as written by
+            older versions
+    """
+    return {
+        name: ColorRole(value if isinstance(value, int) else ColorRole.coerce(value["hex"]).argb)
+        for name, value in stored.items()
+    }
+
+
+def scheme_argb(colors: Mapping[str, ColorRole]) -> dict[str, int]:
+    """Role name -> ARGB int of a color dict, the form schemes are cached in."""
+    return {name: role.argb for name, role in colors.items()}
+
+
 def generate_scheme(
     image_path: str | Path,
     mode: str = "dark",
     scheme_type: str = "tonal-spot",
     contrast: float = 0.0,
+    cache: ColorCache | None = None,
+    pixels: "np.ndarray | None" = None,
 ) -> dict:
     """
     Generate MD3 color scheme from image.
@@ -75,16 +339,244 @@ def generate_scheme(
         mode: "dark" or "light"
         scheme_type: One of SCHEME_MAP keys
         contrast: Contrast level (-1.0 to 1.0)
+        cache: Optional ColorCache; known images skip decoding entirely,
+            near-duplicates of known images skip quantization
+        pixels: Already decoded (H, W, 3) RGB array of the image; used
+            instead of decoding image_path when the seed is needed
     
     Returns:
-        Dict with color names as keys, values are dicts with 'hex' and 'hex_stripped'
+        Dict with color names as keys, values are ColorRoles
+    """
+    if cache is None:
+        scored = seed_candidates_from_pixels(seed_thumbnail(image_path, pixels))
+        seed = scored[0] if scored else FALLBACK_SEED
+        return generate_scheme_from_seed(seed, mode, scheme_type, contrast)
+
+    with span("cache.lookup"):
+        key = cache.image_key(image_path)
+        entry = cache.get(key) or {}
+    schemes = entry.setdefault("schemes", {})
+    skey = scheme_key(mode, scheme_type, contrast)
+
+    if skey in schemes:
+        count("cache.scheme.hit")
+        return scheme_colors(schemes[skey])
+    count("cache.scheme.miss")
+
+    if "seed" not in entry:
+        img = seed_thumbnail(image_path, pixels)
+        if not copy_duplicate_seed(entry, cache, key, img):
+            scored = seed_candidates_from_pixels(img)
+            entry["seed"] = scored[0] if scored else FALLBACK_SEED
+            entry["candidates"] = scored
+        elif skey in schemes:
+            with span("cache.store"):
+                cache.put(key, entry)
+            return scheme_colors(schemes[skey])
+
+    colors = generate_scheme_from_seed(entry["seed"], mode, scheme_type, contrast)
+    schemes[skey] = scheme_argb(colors)
+    with span("cache.store"):
+        cache.put(key, entry)
+    return colors
+
+
+def generate_scheme_modes(
+    image_path: str | Path,
+    scheme_type: str = "tonal-spot",
+    contrast: float = 0.0,
+    cache: ColorCache | None = None,
+    modes: tuple[str, ...] = ("dark", "light"),
+) -> dict[str, dict]:
+    """
+    Generate one scheme for several modes from a single seed extraction.
+
+    The seed is converted to Hct once and shared by every mode.
+
+    Args:
+        image_path: Path to source image
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
+        cache: Optional ColorCache; supplies and receives the seed and schemes
+        modes: Modes to generate
+
+    Returns:
+        {mode: color dict as returned by generate_scheme}
     """
-    seed = extract_seed_color(image_path)
-    source_hct = Hct.from_int(seed)
+    if cache is not None:
+        with span("cache.lookup"):
+            key = cache.image_key(image_path)
+            entry = cache.get(key) or {}
+    else:
+        entry = {}
+    schemes = entry.setdefault("schemes", {})
+
+    missing = [mode for mode in modes if scheme_key(mode, scheme_type, contrast) not in schemes]
+    count("cache.scheme.hit", len(modes) - len(missing))
+    count("cache.scheme.miss", len(missing))
+
+    if missing:
+        from materialyoucolor.hct import Hct
+
+        if "seed" not in entry:
+            img = seed_thumbnail(image_path)
+            if cache is None or not copy_duplicate_seed(entry, cache, key, img):
+                candidates = seed_candidates_from_pixels(img)
+                entry["seed"] = candidates[0] if candidates else FALLBACK_SEED
+                entry["candidates"] = candidates
+            missing = [
+                mode for mode in missing if scheme_key(mode, scheme_type, contrast) not in schemes
+            ]
+
+        source_hct = Hct.from_int(entry["seed"])
+        for mode in missing:
+            schemes[scheme_key(mode, scheme_type, contrast)] = scheme_argb(
+                generate_scheme_from_hct(source_hct, mode, scheme_type, contrast)
+            )
+
+        if cache is not None:
+            with span("cache.store"):
+                cache.put(key, entry)
+
+    return {
+        mode: scheme_colors(schemes[scheme_key(mode, scheme_type, contrast)]) for mode in modes
+    }
+
+
+def generate_scheme_progressive(
+    image_path: str | Path,
+    mode: str = "dark",
+    scheme_type: str = "tonal-spot",
+    contrast: float = 0.0,
+    cache: ColorCache | None = None,
+    threshold: float = REFINE_THRESHOLD,
+):
+    """
+    Generate MD3 color schemes progressively: fast first, exact later.
+
+    The image is decoded once to the usual seed thumbnail. A provisional
+    seed is quantized from a PROVISIONAL_THUMBNAIL_SIZE copy of it and its
+    colors are yielded right away; then the full thumbnail is quantized and
+    its colors are yielded only if the refined seed is more than threshold
+    away from the provisional one. Images whose seed is already cached
+    yield their final colors once.
+
+    Args:
+        image_path: Path to source image
+        mode: "dark" or "light"
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
+        cache: Optional ColorCache; receives the applied seed and the
+            full candidate list
+        threshold: Minimum seed_distance() that triggers a second yield
+
+    Yields:
+        Color dicts as returned by generate_scheme
+    """
+    from decode import REDUCING_GAP
+
+    if cache is not None:
+        with span("cache.lookup"):
+            key = cache.image_key(image_path)
+            entry = cache.get(key) or {}
+        if "seed" in entry:
+            yield generate_scheme(image_path, mode, scheme_type, contrast, cache)
+            return
+    else:
+        entry = {}
+
+    img = seed_thumbnail(image_path)
+
+    # A cached near-duplicate already knows the final seed
+    if cache is not None and copy_duplicate_seed(entry, cache, key, img):
+        with span("cache.store"):
+            cache.put(key, entry)
+        yield generate_scheme(image_path, mode, scheme_type, contrast, cache)
+        return
+
+    with span("seed.provisional"):
+        small = img.copy()
+        small.thumbnail(
+            (PROVISIONAL_THUMBNAIL_SIZE, PROVISIONAL_THUMBNAIL_SIZE),
+            reducing_gap=REDUCING_GAP,
+        )
+        provisional = seed_candidates_from_pixels(small)
+    provisional_seed = provisional[0] if provisional else FALLBACK_SEED
+    yield generate_scheme_from_seed(provisional_seed, mode, scheme_type, contrast)
+
+    candidates = seed_candidates_from_pixels(img)
+    seed = candidates[0] if candidates else FALLBACK_SEED
+    refine = seed_distance(provisional_seed, seed) > threshold
+    count("seed.refined" if refine else "seed.provisional_kept")
+
+    if cache is not None:
+        # Cache the seed that ended up applied, so re-applying the image later
+        # reproduces the same files
+        entry["seed"] = seed if refine else provisional_seed
+        entry["candidates"] = candidates
+        if refine:
+            colors = generate_scheme_from_seed(seed, mode, scheme_type, contrast)
+            entry.setdefault("schemes", {})[scheme_key(mode, scheme_type, contrast)] = (
+                scheme_argb(colors)
+            )
+        with span("cache.store"):
+            cache.put(key, entry)
+        if refine:
+            yield colors
+    elif refine:
+        yield generate_scheme_from_seed(seed, mode, scheme_type, contrast)
+
+
+def generate_scheme_from_seed(
+    seed: int,
+    mode: str = "dark",
+    scheme_type: str = "tonal-spot",
+    contrast: float = 0.0,
+) -> dict:
+    """
+    Generate MD3 color scheme from an already extracted seed color.
+    
+    Args:
+        seed: Seed color as ARGB int
+        mode: "dark" or "light"
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
     
+    Returns:
+        Dict with color names as keys, values are ColorRoles
+    """
+    from materialyoucolor.hct import Hct
+
+    return generate_scheme_from_hct(Hct.from_int(seed), mode, scheme_type, contrast)
+
+
+def generate_scheme_from_hct(
+    source_hct,
+    mode: str = "dark",
+    scheme_type: str = "tonal-spot",
+    contrast: float = 0.0,
+) -> dict:
+    """
+    Generate MD3 color scheme from a seed already converted to Hct.
+
+    Lets callers that build many schemes from one seed (preview) convert it
+    once.
+
+    Args:
+        source_hct: Seed color as materialyoucolor Hct
+        mode: "dark" or "light"
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
+
+    Returns:
+        Dict with color names as keys, values are ColorRoles
+    """
+    from materialyoucolor.dynamiccolor.material_dynamic_colors import MaterialDynamicColors
+
     is_dark = mode.lower() == "dark"
-    scheme_class = SCHEME_MAP.get(scheme_type, SchemeTonalSpot)
-    scheme = scheme_class(source_hct, is_dark, contrast)
+    scheme_class = SCHEME_MAP[scheme_type if scheme_type in SCHEME_MAP else "tonal-spot"]
+    with span("scheme.build"):
+        scheme = scheme_class(source_hct, is_dark, contrast)
     
     # Map MaterialDynamicColors attributes (camelCase) to output names (snake_case)
     # The attribute names use camelCase, output keys use snake_case for template compatibility
@@ -140,15 +632,12 @@ def generate_scheme(
     }
     
     colors = {}
-    for name, getter in color_getters.items():
-        try:
-            argb = getter.get_argb(scheme)
-            colors[name] = {
-                "hex": argb_to_hex(argb),
-                "hex_stripped": argb_to_hex_stripped(argb),
-            }
-        except Exception:
-            # Fallback for missing colors
-            colors[name] = {"hex": "#000000", "hex_stripped": "000000"}
-    
+    with span("scheme.roles"):
+        for name, getter in color_getters.items():
+            try:
+                colors[name] = ColorRole(getter.get_argb(scheme))
+            except Exception:
+                # Fallback for missing colors
+                colors[name] = ColorRole(0xFF000000)
+
     return colors
@@ -0,0 +1,217 @@
+"""
+Persistent col_gen daemon - keeps heavy modules, templates and the quantizer warm.
+
+Requests arrive over a Unix socket as a single JSON line:
+    {"argv": ["image", "/path/to/wall.png", "-m", "dark"], "cwd": "/home/user"}
+
+and are answered with a single JSON line:
+    {"code": 0, "stdout": "...", "stderr": "..."}
+
+Requests are handled one at a time, so runs never overlap on the output files.
+"""
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Callable
+
+import timings
+from client import FORWARDED_COMMANDS, socket_path
+
+
+def warm_up() -> None:
+    """Import and exercise the expensive parts once so the first request is fast."""
+    import numpy as np
+
+    from analyze import import_cv2, score_grid
+    from colors import SCHEME_MAP, generate_scheme_from_seed, seed_candidates_from_pixels
+    from templates import preload_templates
+
+    # Modules are imported lazily by the stage that uses them; resolve them
+    # all here instead of on the first request
+    for name in SCHEME_MAP:
+        SCHEME_MAP[name]
+    import_cv2()
+
+    seed_candidates_from_pixels(np.array([[66, 133, 244], [219, 68, 55]], dtype=np.uint8))
+    generate_scheme_from_seed(0xFF4285F4)
+    score_grid(np.zeros((36, 64), dtype=np.uint8), 16, 9)
+    preload_templates()
+
+
+def run_request(
+    dispatch: Callable[[list[str]], int], argv: list[str], cwd: str | None
+) -> tuple[int, str, str]:
+    """
+    Run one command line through dispatch, capturing its output.
+
+    Args:
+        dispatch: Entry point taking argv and returning an exit code (main.main)
+        argv: Arguments as they would be passed to main.py
+        cwd: Client working directory, used to resolve relative paths
+
+    Returns:
+        (exit code, captured stdout, captured stderr)
+    """
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    if not argv or argv[0] not in FORWARDED_COMMANDS:
+        return 2, "", f"Error: command not handled by daemon: {argv[:1]}\n"
+
+    previous_cwd = os.getcwd()
+    code = 1
+    try:
+        if cwd:
+            os.chdir(cwd)
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                code = dispatch(argv) or 0
+            except SystemExit as e:
+                # argparse errors and explicit exits
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    except OSError as e:
+        stderr.write(f"Error: {e}\n")
+        code = 1
+    finally:
+        os.chdir(previous_cwd)
+
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        started = time.perf_counter()
+
+        try:
+            request = json.loads(line)
+            argv = [str(arg) for arg in request["argv"]]
+            cwd = request.get("cwd")
+        except (ValueError, KeyError, TypeError) as e:
+            code, out, err = 2, "", f"Error: bad request: {e}\n"
+            argv = []
+        else:
+            code, out, err = run_request(self.server.dispatch, argv, cwd)
+
+        reply = json.dumps({"code": code, "stdout": out, "stderr": err}) + "\n"
+        try:
+            self.wfile.write(reply.encode())
+        except OSError:
+            # Client went away; nothing left to report to
+            pass
+
+        if self.server.verbose:
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"[serve] {' '.join(argv)} -> {code} ({elapsed:.1f} ms)", flush=True)
+
+
+class ColGenServer(socketserver.UnixStreamServer):
+    """Single-threaded Unix socket server dispatching to main.main."""
+
+    # handle_request() poll interval (s), bounds how long a stop request
+    # waits while idle
+    timeout = 0.5
+
+    def __init__(
+        self,
+        path: Path,
+        dispatch: Callable[[list[str]], int],
+        verbose: bool = False,
+    ):
+        self.dispatch = dispatch
+        self.verbose = verbose
+        self.stopping = False
+        super().__init__(str(path), _RequestHandler)
+
+
+def _socket_in_use(path: Path) -> bool:
+    """Check whether another daemon is already answering on path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def serve(
+    path: str | Path | None,
+    dispatch: Callable[[list[str]], int],
+    verbose: bool = False,
+) -> int:
+    """
+    Run the daemon until SIGTERM/SIGINT.
+
+    Args:
+        path: Socket path (default: client.socket_path())
+        dispatch: Entry point taking argv and returning an exit code
+        verbose: Log each request
+
+    Returns:
+        Exit code
+    """
+    path = Path(path).expanduser() if path else socket_path()
+
+    if path.exists():
+        if _socket_in_use(path):
+            print(f"Error: daemon already running on {path}", file=sys.stderr)
+            return 1
+        # Stale socket from a crashed daemon
+        path.unlink()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # ru_maxrss only grows over the daemon's lifetime; per request it
+    # would report the largest request served so far
+    timings.without_peak_rss()
+
+    started = time.perf_counter()
+    warm_up()
+    if verbose:
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"[serve] warmed up in {elapsed:.1f} ms", flush=True)
+
+    old_umask = os.umask(0o177)
+    try:
+        server = ColGenServer(path, dispatch, verbose=verbose)
+    finally:
+        os.umask(old_umask)
+
+    # Only set a flag: raising SystemExit here would be caught by
+    # run_request if a request is running. That request finishes and is
+    # answered, then the loop below exits
+    def request_stop(*_):
+        server.stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+
+    print(f"col_gen daemon listening on {path}", flush=True)
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+    return 0
@@ -0,0 +1,166 @@
+"""
+Reduced-resolution image decoding.
+
+Wallpapers are often 4K/8K, but widget analysis only needs a coarse grid.
+JPEG decoders can scale by 1/2, 1/4 or 1/8 inside the IDCT, so the full
+resolution image is never materialized; other formats are decoded in full
+and shrunk by OpenCV.
+
+Seeds are still quantized from a thumbnail of the full decode. The IDCT
+scaling changes noisy and hard-edged images enough to move their seed by
+more than REFINE_THRESHOLD (see bench/seed_regression.py) at every scale,
+so seed decoding only avoids the full-size copies.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# JPEG IDCT scaling factors, largest first
+REDUCTION_FACTORS = (8, 4, 2, 1)
+
+# Decode at least this many times the target size before the final resample,
+# same as PIL's Image.thumbnail default, to keep antialiasing quality
+REDUCING_GAP = 2.0
+
+
+def reduction_factor(
+    width: int, height: int, min_width: int, min_height: int
+) -> int:
+    """
+    Pick the largest reduction factor that keeps the image at least min size.
+
+    Sides are compared long-to-long and short-to-short, so the result does not
+    depend on EXIF rotation.
+
+    Returns:
+        One of REDUCTION_FACTORS
+    """
+    long_side, short_side = max(width, height), min(width, height)
+    min_long, min_short = max(min_width, min_height), min(min_width, min_height)
+
+    for factor in REDUCTION_FACTORS:
+        if long_side // factor >= min_long and short_side // factor >= min_short:
+            return factor
+    return 1
+
+
+def image_size(image_path: str | Path) -> tuple[int, int] | None:
+    """Read (width, height) from the image header without decoding pixels."""
+    try:
+        with Image.open(image_path) as img:
+            return img.size
+    except (OSError, ValueError):
+        return None
+
+
+def image_reduction_factor(
+    image_path: str | Path, min_width: int, min_height: int
+) -> int:
+    """reduction_factor() for an image file, reading only its header (1 if unreadable)."""
+    size = image_size(image_path)
+    return reduction_factor(*size, min_width, min_height) if size else 1
+
+
+def load_thumbnail(image_path: str | Path, size: int = 128) -> Image.Image:
+    """
+    Decode an image to an RGB thumbnail no larger than size x size, with the
+    same pixels as Image.open().convert("RGB").thumbnail((size, size)).
+
+    Args:
+        image_path: Path to image file
+        size: Maximum thumbnail width and height
+
+    Returns:
+        RGB PIL image
+    """
+    img = Image.open(image_path)
+
+    # Palette/alpha modes must be converted before resampling; RGB and L can be
+    # shrunk first so the full resolution copy is never converted. Loading
+    # them first keeps thumbnail() from draft()-decoding JPEGs at 1/N scale
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    else:
+        img.load()
+
+    img.thumbnail((size, size), reducing_gap=REDUCING_GAP)
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def decode_rgb(image_path: str | Path) -> np.ndarray:
+    """
+    Decode an image once into a full resolution RGB array.
+
+    The result is shared by stages that would otherwise each decode the file
+    (see thumbnail_from_array). It is not reduced, as seeds need the full
+    decode (see the module docstring).
+
+    Args:
+        image_path: Path to image file
+
+    Returns:
+        (H, W, 3) uint8 RGB array
+    """
+    img = Image.open(image_path)
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+
+def thumbnail_from_array(pixels: np.ndarray, size: int = 128) -> Image.Image:
+    """
+    Shrink an already decoded RGB array like load_thumbnail would.
+
+    Args:
+        pixels: (H, W, 3) uint8 RGB array
+        size: Maximum thumbnail width and height
+
+    Returns:
+        RGB PIL image
+    """
+    img = Image.fromarray(pixels)
+    img.thumbnail((size, size), reducing_gap=REDUCING_GAP)
+    return img
+
+
+def imread_reduced(
+    image_path: str | Path,
+    min_width: int,
+    min_height: int,
+    factor: int | None = None,
+):
+    """
+    Load an image with OpenCV at the smallest IMREAD_REDUCED_COLOR_* size
+    that still covers min_width x min_height.
+
+    Always decodes in color: the decoders' own gray conversion differs from
+    cv2.cvtColor(..., COLOR_BGR2GRAY), so reduced grayscale flags would
+    change analysis results even where no reduction is applied.
+
+    Args:
+        image_path: Path to image file
+        min_width: Minimum width the caller needs
+        min_height: Minimum height the caller needs
+        factor: Reduction factor if already known (see image_reduction_factor)
+
+    Returns:
+        BGR numpy array as returned by cv2.imread, or None if unreadable
+    """
+    import cv2
+
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+
+    if factor is None:
+        factor = image_reduction_factor(image_path, min_width, min_height)
+    return cv2.imread(str(image_path), flags[factor])
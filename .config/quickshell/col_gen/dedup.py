@@ -0,0 +1,120 @@
+"""
+Near-duplicate wallpaper detection.
+
+Re-downloaded, resized or re-encoded copies of a wallpaper have different
+bytes, so the content-hash cache misses them. Every image also gets a
+signature computed from the seed thumbnail it is decoded to anyway:
+
+    [dhash, r, g, b]
+
+dhash is a 64 bit difference hash of the thumbnail's luminance (9x8
+grayscale, one bit per horizontally adjacent pair); r, g, b is its mean
+color. Two images are near-duplicates when their dhashes differ in at most
+DUPLICATE_THRESHOLD bits and their mean colors by at most MEAN_TOLERANCE
+per channel - the dhash only sees structure, so the mean color keeps e.g.
+two plain gradients of different hues apart.
+
+Matching is standard library only (cache.py uses it on every cache miss);
+PIL and numpy are imported by the functions that need them.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Maximum differing dhash bits (of 64) for a near-duplicate
+DUPLICATE_THRESHOLD = 5
+
+# Maximum mean color difference per channel (0-255) for a near-duplicate
+MEAN_TOLERANCE = 8
+
+# Images compared per vectorized step of duplicate_clusters
+_BLOCK = 256
+
+
+def dhash(img: "Image.Image") -> int:
+    """64 bit difference hash of an image's luminance."""
+    from PIL import Image
+
+    gray = img.convert("L").resize((9, 8), Image.Resampling.BOX)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def image_signature(img: "Image.Image") -> list[int]:
+    """[dhash, mean r, mean g, mean b] of an RGB thumbnail."""
+    from PIL import Image
+
+    mean = img.convert("RGB").resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return [dhash(img), *mean]
+
+
+def signature_distance(a: list[int], b: list[int]) -> int | None:
+    """
+    Differing dhash bits of two signatures.
+
+    Returns:
+        Bit count, or None if the mean colors are too far apart to be the
+        same image
+    """
+    if any(abs(x - y) > MEAN_TOLERANCE for x, y in zip(a[1:], b[1:])):
+        return None
+    return (a[0] ^ b[0]).bit_count()
+
+
+def duplicate_clusters(
+    signatures: dict[str, list[int]], threshold: int = DUPLICATE_THRESHOLD
+) -> list[list[str]]:
+    """
+    Group near-duplicate images (connected components of the pairwise
+    near-duplicate relation).
+
+    Args:
+        signatures: name (path or hash) -> image_signature()
+        threshold: Maximum differing dhash bits
+
+    Returns:
+        Clusters of two or more names, largest first, each sorted
+    """
+    import numpy as np
+
+    names = list(signatures)
+    if len(names) < 2:
+        return []
+    hashes = np.array([signatures[n][0] for n in names], dtype=np.uint64)
+    means = np.array([signatures[n][1:] for n in names], dtype=np.int64)
+
+    parent = list(range(len(names)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Compare a block of images against all later ones at once, then
+    # check the mean colors of the few pairs with close hashes
+    for start in range(0, len(names), _BLOCK):
+        bits = np.bitwise_count(hashes[start:start + _BLOCK, None] ^ hashes[None, start:])
+        for i, j in zip(*np.nonzero(bits <= threshold)):
+            i, j = int(i) + start, int(j) + start
+            if i >= j or np.abs(means[i] - means[j]).max() > MEAN_TOLERANCE:
+                continue
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+
+    clusters: dict[int, list[str]] = {}
+    for i, name in enumerate(names):
+        clusters.setdefault(find(i), []).append(name)
+    return sorted(
+        (sorted(members) for members in clusters.values() if len(members) > 1),
+        key=lambda members: (-len(members), members[0]),
+    )
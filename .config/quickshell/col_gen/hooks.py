@@ -1,65 +1,355 @@
 """
-Post-generation hooks - run shell commands after templates are written.
+Post-generation hooks - reload applications after templates are written.
+
+Hooks are independent of each other and run concurrently, each with its own
+timeout. A hook declares the output files it reloads, and is skipped when
+none of them changed.
+
+Where possible a hook runs a native backend in-process instead of spawning
+a shell:
+
+    hyprland  "reload" written to Hyprland's IPC socket
+    ghostty   SIGUSR2 sent to processes found by scanning /proc
+    gtk       both gtk-theme writes through one Gio.Settings (PyGObject)
+    waybar    like ghostty
+
+If the backend is unavailable (no Hyprland socket, no PyGObject, ...) the
+hook falls back to its shell command.
 """
 
-import subprocess
+import os
 import shutil
+import signal
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from timings import count, span
+
+
+class NativeUnavailable(Exception):
+    """A native hook backend cannot run here; use the shell command instead."""
+
+
+def hyprland_socket_path() -> Path:
+    """
+    Hyprland's request socket for the running instance.
+
+    Raises:
+        NativeUnavailable: Not running under Hyprland or no socket found
+    """
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        raise NativeUnavailable("HYPRLAND_INSTANCE_SIGNATURE not set")
+
+    # $XDG_RUNTIME_DIR/hypr since Hyprland 0.40, /tmp/hypr before
+    candidates = [Path("/tmp/hypr") / signature / ".socket.sock"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        candidates.insert(0, Path(runtime_dir) / "hypr" / signature / ".socket.sock")
+
+    for path in candidates:
+        if path.exists():
+            return path
+    raise NativeUnavailable(f"no Hyprland socket for instance {signature}")
+
+
+def hyprland_request(command: str, timeout: float = 5.0) -> str:
+    """Send one request over Hyprland's IPC socket (like hyprctl) and return the reply."""
+    path = hyprland_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            # Stale socket of an exited instance
+            raise NativeUnavailable(f"cannot connect to {path}: {e}") from e
+        sock.sendall(command.encode())
+
+        chunks = []
+        while chunk := sock.recv(8192):
+            chunks.append(chunk)
+    return b"".join(chunks).decode(errors="replace")
+
+
+def hyprland_reload(mode: str, timeout: float = 5.0) -> str:
+    """Native backend of the hyprland hook."""
+    reply = hyprland_request("reload", timeout).strip()
+    if reply != "ok":
+        raise RuntimeError(f"hyprland replied {reply!r}")
+    return reply
+
+
+def signal_processes(name: str, signum: int, proc_root: str = "/proc") -> int:
+    """
+    Send signum to every process whose name (comm) is name, like pkill.
+
+    Unlike pkill's pattern, the name must match exactly. Processes that
+    exit meanwhile or belong to other users are skipped.
+
+    Returns:
+        Number of processes signalled
+    """
+    # comm is truncated to 15 characters by the kernel
+    name = name[:15]
+    own_pid = os.getpid()
+    signalled = 0
+    with os.scandir(proc_root) as entries:
+        for entry in entries:
+            if not entry.name.isdigit() or int(entry.name) == own_pid:
+                continue
+            try:
+                with open(f"{entry.path}/comm") as f:
+                    if f.read().rstrip("\n") != name:
+                        continue
+                os.kill(int(entry.name), signum)
+                signalled += 1
+            except (OSError, ValueError):
+                continue
+    return signalled
+
+
+def signal_backend(name: str, signum: int, mode: str, timeout: float = 5.0) -> str:
+    """Native backend of the ghostty/waybar hooks (pkill -SIG name)."""
+    signalled = signal_processes(name, signum)
+    return f"signalled {signalled} {name} process{'es' if signalled != 1 else ''}"
+
+
+def gtk_set_theme(mode: str, timeout: float = 5.0) -> str:
+    """Native backend of the gtk hook: reset and set gtk-theme in one Gio.Settings."""
+    try:
+        from gi.repository import Gio
+    except ImportError as e:
+        raise NativeUnavailable(f"PyGObject not available: {e}") from e
+
+    schema_id = "org.gnome.desktop.interface"
+    source = Gio.SettingsSchemaSource.get_default()
+    if source is None or source.lookup(schema_id, True) is None:
+        raise NativeUnavailable(f"schema {schema_id} not installed")
+
+    settings = Gio.Settings.new(schema_id)
+    theme = f"adw-gtk3-{mode}"
+    # Emptying it first makes GTK apps re-read the theme even if unchanged
+    settings.set_string("gtk-theme", "")
+    settings.set_string("gtk-theme", theme)
+    Gio.Settings.sync()
+    return f"gtk-theme {theme}"
+
+
+class Hook(NamedTuple):
+    name: str
+    # Shell command, {mode} is substituted
+    command: str
+    # Only run if this binary exists (None: always run)
+    check_binary: str | None
+    # TEMPLATE_OUTPUTS paths this hook reloads
+    outputs: tuple[str, ...]
+    # Seconds before the hook is killed
+    timeout: float = 10.0
+    # In-process alternative, called as native(mode, timeout=...); may
+    # raise NativeUnavailable to fall back to command
+    native: Callable[..., str] | None = None
+
+
+class HookResult(NamedTuple):
+    name: str
+    # "ok", "failed", "timeout" or "skipped"
+    status: str
+    returncode: int | None = None
+    duration: float = 0.0
+    reason: str = ""
+    stdout: str = ""
+    stderr: str = ""
+    # "native" or "shell"
+    backend: str = "shell"
+
 
 # Hooks to run after generation
-# Each hook: (name, command, check_binary)
-# check_binary: if set, only run if this binary exists
 HOOKS = [
-    ("hyprland", "hyprctl reload", "hyprctl"),
-    ("ghostty", "pkill -SIGUSR2 ghostty", "ghostty"),
-    (
+    Hook(
+        "hyprland",
+        "hyprctl reload",
+        "hyprctl",
+        ("~/.config/hypr/colors.conf",),
+        5.0,
+        hyprland_reload,
+    ),
+    Hook(
+        "ghostty",
+        "pkill -SIGUSR2 ghostty",
+        "ghostty",
+        ("~/.config/ghostty/themes/Matugen.conf",),
+        2.0,
+        partial(signal_backend, "ghostty", signal.SIGUSR2),
+    ),
+    Hook(
         "gtk",
         'gsettings set org.gnome.desktop.interface gtk-theme ""; gsettings set org.gnome.desktop.interface gtk-theme adw-gtk3-{mode}',
         "gsettings",
+        ("~/.config/gtk-3.0/colors.css", "~/.config/gtk-4.0/colors.css"),
+        5.0,
+        gtk_set_theme,
+    ),
+    Hook(
+        "waybar",
+        "pkill -SIGUSR2 waybar",
+        "waybar",
+        ("~/.config/waybar/colors.css",),
+        2.0,
+        partial(signal_backend, "waybar", signal.SIGUSR2),
     ),
-    ("waybar", "pkill -SIGUSR2 waybar", "waybar"),
 ]
 
 
-def run_hooks(mode: str, verbose: bool = False) -> list[str]:
+def run_native(hook: Hook, mode: str) -> HookResult | None:
     """
-    Run post-generation hooks.
-
-    Args:
-        mode: "dark" or "light" (used in gtk hook)
-        verbose: Print hook output
+    Run a hook's native backend.
 
     Returns:
-        List of successfully executed hook names
+        HookResult, or None if the backend is unavailable and the shell
+        command should run instead
     """
-    executed = []
+    started = time.perf_counter()
+    try:
+        with span(f"hook.{hook.name}"):
+            detail = hook.native(mode, timeout=hook.timeout)
+    except NativeUnavailable:
+        count("hooks.fallback")
+        return None
+    except TimeoutError:
+        count("hooks.timeout")
+        return HookResult(
+            hook.name,
+            "timeout",
+            duration=time.perf_counter() - started,
+            reason=f"timed out after {hook.timeout:g}s",
+            backend="native",
+        )
+    except Exception as e:
+        return HookResult(
+            hook.name,
+            "failed",
+            duration=time.perf_counter() - started,
+            reason=str(e),
+            backend="native",
+        )
 
-    for name, command, check_binary in HOOKS:
-        # Check if required binary exists
-        if check_binary and not shutil.which(check_binary):
-            if verbose:
-                print(f"Skipping {name} hook: {check_binary} not found")
-            continue
+    return HookResult(
+        hook.name,
+        "ok",
+        returncode=0,
+        duration=time.perf_counter() - started,
+        stdout=detail,
+        backend="native",
+    )
 
-        # Substitute mode in command
-        cmd = command.format(mode=mode)
 
-        try:
+def run_hook(hook: Hook, mode: str, native: bool = True) -> HookResult:
+    """Run a single hook, timing it (natively if possible, see run_native)."""
+    if native and hook.native is not None:
+        result = run_native(hook, mode)
+        if result is not None:
+            return result
+
+    cmd = hook.command.format(mode=mode)
+    started = time.perf_counter()
+
+    try:
+        with span(f"hook.{hook.name}"):
             result = subprocess.run(
                 cmd,
                 shell=True,
                 capture_output=True,
                 text=True,
-                timeout=10,
+                timeout=hook.timeout,
             )
-            if verbose:
-                if result.stdout:
-                    print(f"[{name}] {result.stdout.strip()}")
-                if result.stderr:
-                    print(f"[{name}] stderr: {result.stderr.strip()}")
-            executed.append(name)
-        except subprocess.TimeoutExpired:
-            print(f"Hook {name} timed out")
-        except Exception as e:
-            print(f"Hook {name} failed: {e}")
-
-    return executed
+    except subprocess.TimeoutExpired:
+        count("hooks.timeout")
+        return HookResult(
+            hook.name,
+            "timeout",
+            duration=time.perf_counter() - started,
+            reason=f"timed out after {hook.timeout:g}s",
+        )
+    except Exception as e:
+        return HookResult(
+            hook.name, "failed", duration=time.perf_counter() - started, reason=str(e)
+        )
+
+    return HookResult(
+        hook.name,
+        # Like before, a non-zero exit (e.g. pkill finding no process) still
+        # counts as executed; the code is reported for diagnosis
+        "ok",
+        returncode=result.returncode,
+        duration=time.perf_counter() - started,
+        stdout=result.stdout.strip(),
+        stderr=result.stderr.strip(),
+    )
+
+
+def run_hooks(
+    mode: str,
+    verbose: bool = False,
+    changed: list[str] | None = None,
+    hooks: list[Hook] | None = None,
+    native: bool = True,
+) -> list[HookResult]:
+    """
+    Run post-generation hooks concurrently.
+
+    Args:
+        mode: "dark" or "light" (used in gtk hook)
+        verbose: Print hook output and timings
+        changed: Output paths that changed; hooks whose outputs are all
+            unchanged are skipped (None runs every hook)
+        hooks: Hooks to run (default: HOOKS)
+        native: Use in-process backends where available (False always
+            runs the shell commands)
+
+    Returns:
+        One HookResult per hook, in hook order
+    """
+    hooks = HOOKS if hooks is None else hooks
+    changed_set = None if changed is None else set(changed)
+
+    results: dict[str, HookResult] = {}
+    runnable = []
+    for hook in hooks:
+        if changed_set is not None and not changed_set.intersection(hook.outputs):
+            results[hook.name] = HookResult(hook.name, "skipped", reason="outputs unchanged")
+        elif hook.check_binary and not shutil.which(hook.check_binary):
+            results[hook.name] = HookResult(
+                hook.name, "skipped", reason=f"{hook.check_binary} not found"
+            )
+        else:
+            runnable.append(hook)
+
+    if runnable:
+        with ThreadPoolExecutor(max_workers=len(runnable)) as pool:
+            for result in pool.map(lambda hook: run_hook(hook, mode, native), runnable):
+                results[result.name] = result
+
+    ordered = [results[hook.name] for hook in hooks]
+    count("hooks.skipped", sum(r.status == "skipped" for r in ordered))
+
+    for result in ordered:
+        if result.status in ("timeout", "failed"):
+            print(f"Hook {result.name} {result.status}: {result.reason}")
+        elif verbose and result.status == "skipped":
+            print(f"Skipping {result.name} hook: {result.reason}")
+        elif verbose:
+            print(
+                f"[{result.name}] {result.backend} exit {result.returncode} "
+                f"in {result.duration * 1000:.1f} ms"
+            )
+            if result.stdout:
+                print(f"[{result.name}] {result.stdout}")
+            if result.stderr:
+                print(f"[{result.name}] stderr: {result.stderr}")
+
+    return ordered
@@ -0,0 +1,279 @@
+"""
+Wallpaper library precomputation (col_gen batch).
+
+Every image in a directory gets its seed candidates and color scheme
+computed in a process pool. Color dicts land in the ColorCache, so applying
+a library wallpaper later is a cache hit plus a template render, and one
+compact JSON-lines record per image is kept in
+$XDG_CACHE_HOME/col_gen/library.jsonl:
+
+    {"path": "...", "mtime_ns": 0, "size": 0, "hash": "...", "seed": 0, "candidates": [...],
+     "signature": [dhash, r, g, b]}
+
+The signatures (see dedup.py) also go into the cache's near-duplicate
+index, and `duplicates` reports near-duplicate clusters from them.
+
+Re-runs only process files that are new, changed on disk (mtime/size), or
+lack the requested scheme.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from cache import ColorCache, cache_dir, hash_file, scheme_key
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+DEFAULT_LIBRARY_DIR = Path.home() / ".local/wallpapers"
+
+# Persist the index every this many processed images
+SAVE_EVERY = 50
+
+
+def find_images(directory: str | Path) -> list[Path]:
+    """List wallpaper images directly inside directory, sorted by name."""
+    directory = Path(directory).expanduser().resolve()
+    return sorted(
+        p for p in directory.iterdir()
+        if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+class LibraryIndex:
+    """Path-keyed JSON-lines index of precomputed wallpapers."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else self.default_path()
+        self.records: dict[str, dict] = {}
+        self._load()
+
+    @staticmethod
+    def default_path() -> Path:
+        return cache_dir() / "library.jsonl"
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.records[record["path"]] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+
+    def get(self, path: str | Path) -> dict | None:
+        return self.records.get(str(path))
+
+    def is_current(self, path: str | Path, st: os.stat_result) -> dict | None:
+        """Return the record for path if it matches the file's mtime and size."""
+        record = self.get(path)
+        if record and record["mtime_ns"] == st.st_mtime_ns and record["size"] == st.st_size:
+            return record
+        return None
+
+    def update(self, record: dict) -> None:
+        self.records[record["path"]] = record
+
+    def prune(self, directory: str | Path) -> int:
+        """Drop records for files in directory that no longer exist."""
+        prefix = str(Path(directory).expanduser().resolve()) + os.sep
+        stale = [
+            p for p in self.records
+            if p.startswith(prefix) and not os.path.exists(p)
+        ]
+        for p in stale:
+            del self.records[p]
+        return len(stale)
+
+    def save(self) -> None:
+        """Rewrite the index atomically, one compact record per line."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp, "w") as f:
+            for record in self.records.values():
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+
+
+def process_image(
+    path: str,
+    mode: str,
+    scheme_type: str,
+    contrast: float,
+    seed: int | None = None,
+) -> dict:
+    """
+    Worker: hash an image and generate its colors.
+
+    Args:
+        path: Absolute image path
+        mode: "dark" or "light"
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
+        seed: Known seed; skips decoding and quantization when set
+
+    Returns:
+        Index record plus "colors" (role -> ARGB; and "candidates" and "signature" when
+        extracted)
+    """
+    from colors import (
+        FALLBACK_SEED,
+        generate_scheme_from_seed,
+        scheme_argb,
+        seed_candidates_from_pixels,
+        seed_thumbnail,
+    )
+    from dedup import image_signature
+
+    started = time.perf_counter()
+    st = os.stat(path)
+    record = {
+        "path": path,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "hash": hash_file(path),
+    }
+
+    if seed is None:
+        img = seed_thumbnail(path)
+        candidates = seed_candidates_from_pixels(img)
+        seed = candidates[0] if candidates else FALLBACK_SEED
+        record["candidates"] = candidates
+        record["signature"] = image_signature(img)
+    record["seed"] = seed
+
+    record["colors"] = scheme_argb(generate_scheme_from_seed(seed, mode, scheme_type, contrast))
+    record["elapsed"] = time.perf_counter() - started
+    return record
+
+
+def run_batch(
+    directory: str | Path,
+    mode: str = "dark",
+    scheme_type: str = "tonal-spot",
+    contrast: float = 0.0,
+    jobs: int | None = None,
+    cache: ColorCache | None = None,
+    index: LibraryIndex | None = None,
+    verbose: bool = False,
+) -> dict:
+    """
+    Precompute colors for every image in directory.
+
+    Args:
+        directory: Wallpaper directory
+        mode: "dark" or "light"
+        scheme_type: One of SCHEME_MAP keys
+        contrast: Contrast level (-1.0 to 1.0)
+        jobs: Worker processes (default: CPU count, 1 runs in-process)
+        cache: ColorCache to fill (default: the user cache)
+        index: LibraryIndex to update (default: the user index)
+        verbose: Print per-image timings
+
+    Returns:
+        Counts: {"total", "processed", "skipped", "failed", "pruned"}
+    """
+    cache = cache or ColorCache()
+    index = index or LibraryIndex()
+    skey = scheme_key(mode, scheme_type, contrast)
+
+    images = find_images(directory)
+    stats = {"total": len(images), "processed": 0, "skipped": 0, "failed": 0}
+    stats["pruned"] = index.prune(directory)
+
+    # Work out what actually needs doing
+    pending = []
+    for image in images:
+        path = str(image)
+        record = index.is_current(path, image.stat())
+        if record:
+            entry = cache.get(record["hash"]) or {}
+            if skey in entry.get("schemes", {}) and "signature" in record:
+                stats["skipped"] += 1
+                continue
+            # Known image, new scheme: skip decoding (unless indexed before
+            # signatures were)
+            pending.append((path, entry.get("seed") if "signature" in record else None))
+        else:
+            pending.append((path, None))
+
+    def store(result: dict) -> None:
+        colors = result.pop("colors")
+        result.pop("elapsed", None)
+        previous = index.get(result["path"]) or {}
+        if "candidates" not in result:
+            result["candidates"] = previous.get("candidates", [result["seed"]])
+        if "signature" not in result and "signature" in previous:
+            result["signature"] = previous["signature"]
+
+        entry = cache.get(result["hash"]) or {}
+        entry["seed"] = result["seed"]
+        entry["candidates"] = result["candidates"]
+        entry.setdefault("schemes", {})[skey] = colors
+        cache.put(result["hash"], entry, evict=False)
+        cache.record_path(result["path"], result["mtime_ns"], result["size"], result["hash"])
+        if "signature" in result:
+            cache.record_signature(result["hash"], result["signature"])
+        index.update(result)
+
+    def report(done: int, result: dict | None, path: str, error: str | None = None) -> None:
+        name = Path(path).name
+        if error:
+            print(f"[{done}/{len(pending)}] {name}: error: {error}", flush=True)
+        elif verbose:
+            print(f"[{done}/{len(pending)}] {name} ({result['elapsed'] * 1000:.0f} ms)", flush=True)
+        else:
+            print(f"[{done}/{len(pending)}] {name}", flush=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        results = _run_pending(pending, mode, scheme_type, contrast, jobs)
+        for done, (path, result, error) in enumerate(results, 1):
+            if error:
+                stats["failed"] += 1
+                report(done, None, path, error)
+                continue
+            report(done, result, path)
+            store(result)
+            stats["processed"] += 1
+            if done % SAVE_EVERY == 0:
+                index.save()
+    finally:
+        index.save()
+        cache.flush()
+        cache.evict()
+
+    return stats
+
+
+def _run_pending(
+    pending: list[tuple[str, int | None]],
+    mode: str,
+    scheme_type: str,
+    contrast: float,
+    jobs: int,
+):
+    """Yield (path, result, error) as images finish, in-process or in a pool."""
+    if jobs == 1 or len(pending) <= 1:
+        for path, seed in pending:
+            try:
+                yield path, process_image(path, mode, scheme_type, contrast, seed), None
+            except Exception as e:
+                yield path, None, str(e)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(process_image, path, mode, scheme_type, contrast, seed): path
+            for path, seed in pending
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
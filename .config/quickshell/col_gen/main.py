@@ -4,112 +4,995 @@ col_gen - Material You color generator for quickshell
 
 Usage:
     uv run main.py image <path> [options]
-    
+    uv run main.py apply <path> [options] [--cols N --rows N --update-widgets]
+    uv run main.py mode dark|light
+    uv run main.py batch [dir] [-j JOBS]
+    uv run main.py preview <path> [--contrast C ...] [--roles a,b] [-o FILE]
+    uv run main.py search --color '#3366ff' [-k 20] [--json]
+    uv run main.py duplicates [--threshold BITS] [--json]
+    uv run main.py watch [--debounce MS] [--poll]
+    uv run main.py serve [--socket PATH]
+
 Options:
     -m, --mode          dark | light (default: dark)
-    -s, --scheme        tonal-spot | expressive | fidelity | fruit-salad | 
+    -s, --scheme        tonal-spot | expressive | fidelity | fruit-salad |
                         monochrome | neutral | rainbow | vibrant | content
                         (default: tonal-spot)
     -c, --contrast      Contrast level -1.0 to 1.0 (default: 0.0)
     --no-hooks          Skip post-generation hooks
+    --no-cache          Bypass the seed/scheme cache in $XDG_CACHE_HOME/col_gen
+    --progressive       image only: write colors from a 32 px provisional seed
+                        first, then rewrite if the 128 px seed differs by more
+                        than --refine-threshold
+    --timings FORMAT    Print per-stage wall/CPU time, peak RSS and cache
+                        hit/miss counts to stderr (text | json)
+    --profile FILE      Write a cProfile/pstats dump of the run
     -v, --verbose       Verbose output
+
+The apply command is image plus widget placement (analyze.py) from a single
+decode of the wallpaper, with both stages running concurrently.
+The batch command precomputes seeds and schemes for a whole wallpaper
+directory, so applying any of them later is a cache lookup plus render.
+image --both-modes renders dark and light from one seed and keeps both
+(prerender.py); the mode command then switches the last applied wallpaper
+to either mode by writing the stored files and firing hooks, regenerating
+only if they are missing.
+Overlapping image/apply/mode runs (e.g. scrolling through wallpapers) are
+serialized by runlock.py; runs superseded by a newer request exit without
+writing, so the final theme always matches the last selection.
+The preview command prints every scheme in dark and light as one compact
+JSON document for the scheme picker, without writing any outputs.
+The search command lists library wallpapers whose seed candidates are
+perceptually closest to a color, from the color index (search.py) that
+batch runs keep up to date, without decoding any image.
+Images that are near-duplicates of a cached one (re-downloaded, resized,
+re-encoded; dedup.py) reuse its seed, schemes and analysis maps; the
+duplicates command lists near-duplicate clusters in the library.
+The watch command follows the applied wallpaper: editing a template
+re-renders just that template from the cached scheme, replacing the
+wallpaper file regenerates everything. It blocks on inotify (watch.py)
+while idle, or polls where inotify is unavailable.
+The serve command keeps a warm process listening on a Unix socket; the
+generate wrapper forwards image requests to it through client.py and falls
+back to running in-process when no daemon is up.
 """
 
 import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
-from colors import generate_scheme, SCHEME_MAP
-from templates import render_all, write_outputs
+# Only light modules at the top: jinja2, numpy, PIL, cv2 and the
+# materialyoucolor schemes are imported by the stage that needs them
+import timings
+from cache import ColorCache
+from colors import (
+    REFINE_THRESHOLD,
+    SCHEME_MAP,
+    generate_scheme,
+    generate_scheme_modes,
+    generate_scheme_progressive,
+)
+from dedup import DUPLICATE_THRESHOLD
 from hooks import run_hooks
+from library import DEFAULT_LIBRARY_DIR, run_batch
+from placement import DEFAULT_TIME_BUDGET, STRATEGIES
+from runlock import SINGLE_FLIGHT_COMMANDS, RunLock, Superseded, latest_ticket, take_ticket
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Generate Material You colors from an image",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def add_diagnostic_args(parser: argparse.ArgumentParser) -> None:
+    """Add --timings and --profile to a subcommand parser."""
+    parser.add_argument(
+        "--timings",
+        choices=["text", "json"],
+        default=None,
+        help="Print per-stage timings, peak RSS and cache counters to stderr",
     )
-    
-    subparsers = parser.add_subparsers(dest="command", required=True)
-    
-    # image command
-    image_parser = subparsers.add_parser("image", help="Generate colors from image")
-    image_parser.add_argument("path", help="Path to image file")
-    image_parser.add_argument(
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        default=None,
+        help="Write a cProfile dump (load with python -m pstats FILE)",
+    )
+
+
+def add_scheme_args(parser: argparse.ArgumentParser) -> None:
+    """Add --mode, --scheme and --contrast to a subcommand parser."""
+    parser.add_argument(
         "-m", "--mode",
         choices=["dark", "light"],
         default="dark",
         help="Color mode (default: dark)",
     )
-    image_parser.add_argument(
+    parser.add_argument(
         "-s", "--scheme",
         choices=list(SCHEME_MAP.keys()),
         default="tonal-spot",
         help="Scheme type (default: tonal-spot)",
     )
-    image_parser.add_argument(
+    parser.add_argument(
         "-c", "--contrast",
         type=float,
         default=0.0,
         help="Contrast level -1.0 to 1.0 (default: 0.0)",
     )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the col_gen command line parser."""
+    parser = argparse.ArgumentParser(
+        description="Generate Material You colors from an image",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # image command
+    image_parser = subparsers.add_parser("image", help="Generate colors from image")
+    image_parser.add_argument("path", help="Path to image file")
+    add_scheme_args(image_parser)
     image_parser.add_argument(
         "--no-hooks",
         action="store_true",
         help="Skip post-generation hooks",
     )
+    image_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the seed/scheme cache",
+    )
+    image_variants = image_parser.add_mutually_exclusive_group()
+    image_variants.add_argument(
+        "--progressive",
+        action="store_true",
+        help="Apply a provisional seed from a tiny thumbnail first, then refine",
+    )
+    image_variants.add_argument(
+        "--both-modes",
+        action="store_true",
+        help="Pre-render dark and light so `mode` can switch without regenerating",
+    )
+    image_parser.add_argument(
+        "--refine-threshold",
+        type=float,
+        default=REFINE_THRESHOLD,
+        help="Seed distance (CAM16-UCS) above which the refined seed is "
+        f"re-applied (default: {REFINE_THRESHOLD:g})",
+    )
     image_parser.add_argument(
         "-v", "--verbose",
         action="store_true",
         help="Verbose output",
     )
-    
-    args = parser.parse_args()
-    
-    if args.command == "image":
-        image_path = Path(args.path).expanduser().resolve()
-        
-        if not image_path.exists():
-            print(f"Error: Image not found: {image_path}", file=sys.stderr)
-            sys.exit(1)
-        
-        if args.verbose:
-            print(f"Generating colors from: {image_path}")
-            print(f"Mode: {args.mode}, Scheme: {args.scheme}, Contrast: {args.contrast}")
-        
-        # Generate colors
-        colors = generate_scheme(
+
+    # apply command: image + widget placement from one decode
+    apply_parser = subparsers.add_parser(
+        "apply", help="Generate colors and widget placement from one decode"
+    )
+    apply_parser.add_argument("path", help="Path to image file")
+    add_scheme_args(apply_parser)
+    apply_parser.add_argument(
+        "--cols", type=int, default=16, help="Widget grid columns (default: 16)"
+    )
+    apply_parser.add_argument(
+        "--rows", type=int, default=9, help="Widget grid rows (default: 9)"
+    )
+    apply_parser.add_argument(
+        "--strategy",
+        choices=STRATEGIES,
+        default="optimal",
+        help="Widget placement strategy (default: optimal)",
+    )
+    apply_parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=DEFAULT_TIME_BUDGET * 1000,
+        help="Optimal placement search limit in ms (default: %(default)g)",
+    )
+    apply_parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Widget suggestions file (default: ~/.config/quickshell/widget_suggestions.json)",
+    )
+    apply_parser.add_argument(
+        "--update-widgets",
+        action="store_true",
+        help="Also write the placements to widgets.json",
+    )
+    apply_parser.add_argument(
+        "--no-hooks",
+        action="store_true",
+        help="Skip post-generation hooks",
+    )
+    apply_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the seed/scheme cache",
+    )
+    apply_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Verbose output",
+    )
+
+    # batch command
+    batch_parser = subparsers.add_parser(
+        "batch", help="Precompute colors for every wallpaper in a directory"
+    )
+    batch_parser.add_argument(
+        "directory",
+        nargs="?",
+        default=str(DEFAULT_LIBRARY_DIR),
+        help=f"Wallpaper directory (default: {DEFAULT_LIBRARY_DIR})",
+    )
+    add_scheme_args(batch_parser)
+    batch_parser.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=None,
+        help="Worker processes (default: CPU count)",
+    )
+    batch_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Print per-image timings",
+    )
+
+    # mode command
+    mode_parser = subparsers.add_parser(
+        "mode", help="Switch the current theme to dark or light"
+    )
+    mode_parser.add_argument("mode", choices=["dark", "light"], help="Mode to apply")
+    mode_parser.add_argument(
+        "--no-hooks",
+        action="store_true",
+        help="Skip post-generation hooks",
+    )
+    mode_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Verbose output",
+    )
+
+    # preview command
+    preview_parser = subparsers.add_parser(
+        "preview", help="Print every scheme x dark/light for an image as JSON"
+    )
+    preview_parser.add_argument("path", help="Path to image file")
+    preview_parser.add_argument(
+        "-c", "--contrast",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        help="Contrast levels -1.0 to 1.0 (default: 0.0)",
+    )
+    preview_parser.add_argument(
+        "--roles",
+        default=None,
+        help="Comma-separated color names to include (default: all)",
+    )
+    preview_parser.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=None,
+        help="Worker processes (default: CPU count)",
+    )
+    preview_parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Write the JSON here instead of stdout",
+    )
+    preview_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the seed/scheme cache",
+    )
+
+    # search command
+    search_parser = subparsers.add_parser(
+        "search", help="Find library wallpapers matching a color"
+    )
+    search_parser.add_argument(
+        "--color",
+        required=True,
+        help="Color to match, #rrggbb",
+    )
+    search_parser.add_argument(
+        "-k",
+        type=int,
+        default=20,
+        help="Number of wallpapers to list (default: 20)",
+    )
+    search_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print results as a JSON array",
+    )
+
+    # duplicates command
+    duplicates_parser = subparsers.add_parser(
+        "duplicates", help="List near-duplicate wallpapers in the library"
+    )
+    duplicates_parser.add_argument(
+        "--threshold",
+        type=int,
+        default=DUPLICATE_THRESHOLD,
+        help="Maximum differing hash bits of 64 (default: %(default)s)",
+    )
+    duplicates_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print clusters as a JSON array of path arrays",
+    )
+
+    # watch command
+    watch_parser = subparsers.add_parser(
+        "watch", help="Re-apply when the current wallpaper or a template changes"
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=300,
+        help="Wait this long for a burst of changes to settle, ms (default: %(default)g)",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll for changes instead of using inotify",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between polls when polling (default: %(default)g)",
+    )
+    watch_parser.add_argument(
+        "--no-hooks",
+        action="store_true",
+        help="Skip post-generation hooks",
+    )
+    watch_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Verbose output",
+    )
+
+    for subparser in (
+        image_parser,
+        apply_parser,
+        mode_parser,
+        batch_parser,
+        preview_parser,
+        search_parser,
+        duplicates_parser,
+    ):
+        add_diagnostic_args(subparser)
+
+    # Ticket taken by client.py before forwarding to the daemon (see runlock)
+    for subparser in (image_parser, apply_parser, mode_parser):
+        subparser.add_argument("--ticket", type=int, default=None, help=argparse.SUPPRESS)
+
+    # serve command
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a persistent daemon that answers requests over a Unix socket"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=None,
+        help="Socket path (default: $XDG_RUNTIME_DIR/col_gen.sock)",
+    )
+    serve_parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Log each request",
+    )
+
+    return parser
+
+
+def run_image(args: argparse.Namespace, run: RunLock | None = None) -> int:
+    """Generate colors, write templates and run hooks for an image command."""
+    image_path = Path(args.path).expanduser().resolve()
+
+    if not image_path.exists():
+        print(f"Error: Image not found: {image_path}", file=sys.stderr)
+        return 1
+
+    if args.verbose:
+        print(f"Generating colors from: {image_path}")
+        print(f"Mode: {args.mode}, Scheme: {args.scheme}, Contrast: {args.contrast}")
+
+    cache = None if args.no_cache else ColorCache()
+
+    if args.both_modes:
+        return apply_both_modes(
+            image_path, args.mode, args.scheme, args.contrast, args, cache, run
+        )
+
+    if args.progressive:
+        # Provisional colors first, refined ones only if noticeably different
+        stages = generate_scheme_progressive(
             image_path,
             mode=args.mode,
             scheme_type=args.scheme,
             contrast=args.contrast,
+            cache=cache,
+            threshold=args.refine_threshold,
         )
-        
-        if args.verbose:
-            print(f"Generated {len(colors)} colors")
-            print(f"Primary: {colors.get('primary', {}).get('hex', 'N/A')}")
-        
-        # Render templates
-        rendered = render_all(colors, str(image_path), args.mode)
-        
+    else:
+        stages = [
+            generate_scheme(
+                image_path,
+                mode=args.mode,
+                scheme_type=args.scheme,
+                contrast=args.contrast,
+                cache=cache,
+            )
+        ]
+
+    failed = False
+    for stage, colors in enumerate(stages):
+        if stage and args.verbose:
+            print("Refined seed differs from the provisional one, rewriting")
+
+        # A newer selection arrived while generating: leave the outputs to it
+        if run is not None:
+            run.checkpoint()
+
+        written = write_colors(colors, image_path, args)
+        failed = failed or bool(written["failed"])
+
+        print(
+            f"{'Refined' if stage else 'Done'}. Generated {len(colors)} colors, "
+            f"wrote {len(written['changed'])} files ({len(written['unchanged'])} unchanged).",
+            flush=True,
+        )
+
+    record_current(image_path, args.mode, args.scheme, args.contrast, cache)
+    return 1 if failed else 0
+
+
+def record_current(
+    image_path: Path,
+    mode: str,
+    scheme_type: str,
+    contrast: float,
+    cache: ColorCache | None,
+) -> None:
+    """Remember the applied theme for the mode and watch commands."""
+    from cache import hash_file
+    from prerender import RenderedStore
+
+    image_hash = cache.image_key(image_path) if cache is not None else hash_file(image_path)
+    RenderedStore().set_current(
+        str(image_path),
+        RenderedStore.set_key(image_hash, scheme_type, contrast),
+        scheme_type,
+        contrast,
+        mode,
+    )
+
+
+def write_colors(colors: dict, image_path: Path, args: argparse.Namespace) -> dict:
+    """
+    Render templates, write changed outputs and run their hooks.
+
+    Returns:
+        write_outputs() result: {"changed", "unchanged", "failed"}
+    """
+    from templates import render_all
+
+    if args.verbose:
+        print(f"Generated {len(colors)} colors")
+        print(f"Primary: {colors['primary'].hex}")
+
+    # Render templates
+    rendered = render_all(colors, str(image_path), args.mode)
+
+    if args.verbose:
+        print(f"Rendered {len(rendered)} templates")
+
+    return write_rendered(rendered, args.mode, args)
+
+
+def write_rendered(rendered: dict[str, str], mode: str, args: argparse.Namespace) -> dict:
+    """
+    Publish the color map to subscribed components, write rendered
+    templates (unchanged files are left alone) and run the hooks whose
+    outputs changed.
+
+    Returns:
+        write_outputs() result: {"changed", "unchanged", "failed"}
+    """
+    from publish import publish_colors
+    from templates import expand_path, write_outputs
+
+    # Before writing: the update is diffed against the files on disk
+    published = publish_colors(rendered, mode)
+    if args.verbose and published:
+        print(f"Published colors to {published} subscriber(s)")
+
+    written = write_outputs(rendered)
+    changed = written["changed"]
+
+    if args.verbose:
+        for path in changed:
+            print(f"Wrote: {expand_path(path)}")
+        for path in written["unchanged"]:
+            print(f"Unchanged: {expand_path(path)}")
+
+    # Run hooks whose outputs changed
+    if not args.no_hooks:
+        results = run_hooks(mode, verbose=args.verbose, changed=changed)
+        executed = [r.name for r in results if r.status == "ok"]
+        if args.verbose and executed:
+            slowest = max((r for r in results if r.status == "ok"), key=lambda r: r.duration)
+            print(
+                f"Executed hooks: {', '.join(executed)} "
+                f"(slowest: {slowest.name}, {slowest.duration * 1000:.1f} ms)"
+            )
+
+    return written
+
+
+def apply_both_modes(
+    image_path: Path,
+    mode: str,
+    scheme_type: str,
+    contrast: float,
+    args: argparse.Namespace,
+    cache: ColorCache | None,
+    run: RunLock | None = None,
+) -> int:
+    """
+    Apply one mode from pre-rendered dark/light outputs, rendering both
+    first if they are not stored yet.
+    """
+    from cache import hash_file
+    from prerender import RenderedStore
+    from templates import TEMPLATES_DIR, render_all
+
+    store = RenderedStore()
+    image = str(image_path)
+    image_hash = cache.image_key(image_path) if cache is not None else hash_file(image_path)
+    key = store.set_key(image_hash, scheme_type, contrast)
+
+    rendered = store.load(key, mode, image, TEMPLATES_DIR)
+    if rendered is not None:
+        timings.count("prerender.hit")
         if args.verbose:
-            print(f"Rendered {len(rendered)} templates")
-        
-        # Write outputs
-        written = write_outputs(rendered)
-        
+            print(f"Using pre-rendered {mode} outputs")
+    else:
+        timings.count("prerender.miss")
+        colors_by_mode = generate_scheme_modes(image_path, scheme_type, contrast, cache)
+        for variant, colors in colors_by_mode.items():
+            variant_rendered = render_all(colors, image, variant)
+            store.save(key, variant, image, TEMPLATES_DIR, variant_rendered)
+            if variant == mode:
+                rendered = variant_rendered
+        store.prune()
         if args.verbose:
-            for path in written:
-                print(f"Wrote: {path}")
-        
-        # Run hooks
-        if not args.no_hooks:
-            executed = run_hooks(args.mode, verbose=args.verbose)
-            if args.verbose and executed:
-                print(f"Executed hooks: {', '.join(executed)}")
-        
-        print(f"Done. Generated {len(colors)} colors, wrote {len(written)} files.")
+            print(f"Rendered {len(rendered)} templates for {', '.join(colors_by_mode)}")
+
+    if run is not None:
+        run.checkpoint()
+
+    written = write_rendered(rendered, mode, args)
+    store.set_current(image, key, scheme_type, contrast, mode)
+
+    print(
+        f"Done. Applied {mode} mode, wrote {len(written['changed'])} files "
+        f"({len(written['unchanged'])} unchanged)."
+    )
+    return 1 if written["failed"] else 0
+
+
+def run_mode(args: argparse.Namespace, run: RunLock | None = None) -> int:
+    """Switch the last applied wallpaper's theme to another mode."""
+    from prerender import RenderedStore
+
+    current = RenderedStore().current()
+    if current is None:
+        print("Error: No theme applied yet; run the image command first", file=sys.stderr)
+        return 1
+
+    image_path = Path(current["image"])
+    if not image_path.exists():
+        print(f"Error: Image not found: {image_path}", file=sys.stderr)
+        return 1
+
+    return apply_both_modes(
+        image_path,
+        args.mode,
+        current["scheme"],
+        current["contrast"],
+        args,
+        ColorCache(),
+        run,
+    )
+
+
+def run_apply(args: argparse.Namespace, run: RunLock | None = None) -> int:
+    """Generate colors and widget placement for an apply command."""
+    from decode import decode_rgb
+    from analyze import (
+        DEFAULT_OUTPUT,
+        WIDGETS_FILE,
+        apply_suggestions,
+        import_cv2,
+        place_suggestions,
+        score_grid,
+        write_suggestions,
+    )
+
+    image_path = Path(args.path).expanduser().resolve()
+
+    if not image_path.exists():
+        print(f"Error: Image not found: {image_path}", file=sys.stderr)
+        return 1
+
+    if args.verbose:
+        print(f"Applying: {image_path}")
+        print(f"Mode: {args.mode}, Scheme: {args.scheme}, Contrast: {args.contrast}")
+        print(f"Grid: {args.cols}x{args.rows}")
+
+    # One decode shared by the seed thumbnail and the grid
+    try:
+        with timings.span("apply.decode"):
+            pixels = decode_rgb(image_path)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load image: {e}", file=sys.stderr)
+        return 1
+
+    def color_stage() -> tuple[dict, dict]:
+        cache = None if args.no_cache else ColorCache()
+        colors = generate_scheme(
+            image_path,
+            mode=args.mode,
+            scheme_type=args.scheme,
+            contrast=args.contrast,
+            cache=cache,
+            pixels=pixels,
+        )
+        if run is not None:
+            run.checkpoint()
+        written = write_colors(colors, image_path, args)
+        record_current(image_path, args.mode, args.scheme, args.contrast, cache)
+        return colors, written
+
+    def widget_stage() -> list:
+        cv2 = import_cv2()
+        with timings.span("analyze.gray"):
+            gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        scores = score_grid(gray, args.cols, args.rows)
+        return place_suggestions(
+            scores, args.verbose, args.strategy, args.time_budget / 1000
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        color_future = pool.submit(color_stage)
+        widget_future = pool.submit(widget_stage)
+        colors, written = color_future.result()
+        try:
+            widgets = widget_future.result()
+        except Exception as e:
+            print(f"Error: Widget placement failed: {e}", file=sys.stderr)
+            widgets = None
+
+    if widgets is not None:
+        output_path = write_suggestions(
+            widgets, str(image_path), args.cols, args.rows, args.output or DEFAULT_OUTPUT
+        )
+        print(f"Wrote suggestions to: {output_path}")
+        if args.update_widgets:
+            apply_suggestions(widgets)
+            print(f"Applied to: {WIDGETS_FILE}")
+
+    print(
+        f"Done. Generated {len(colors)} colors, wrote {len(written['changed'])} files "
+        f"({len(written['unchanged'])} unchanged), placed "
+        f"{len(widgets) if widgets is not None else 0} widgets."
+    )
+    return 1 if written["failed"] or widgets is None else 0
+
+
+def run_batch_command(args: argparse.Namespace) -> int:
+    """Precompute a wallpaper directory into the cache and library index."""
+    directory = Path(args.directory).expanduser()
+    if not directory.is_dir():
+        print(f"Error: Not a directory: {directory}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    stats = run_batch(
+        directory,
+        mode=args.mode,
+        scheme_type=args.scheme,
+        contrast=args.contrast,
+        jobs=args.jobs,
+        verbose=args.verbose,
+    )
+
+    # Keep search queries from having to rebuild the color index
+    if stats["processed"] or stats["pruned"]:
+        from search import load_color_index
+
+        load_color_index()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Done. {stats['processed']} processed, {stats['skipped']} up to date, "
+        f"{stats['failed']} failed of {stats['total']} images in {elapsed:.1f}s."
+    )
+    return 1 if stats["failed"] else 0
+
+
+def run_search(args: argparse.Namespace) -> int:
+    """Print library wallpapers closest to a color for a search command."""
+    import json
+
+    from search import load_color_index, parse_color
+
+    try:
+        color = parse_color(args.color)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    index = load_color_index()
+    if not len(index):
+        print("Error: Wallpaper library is empty; run the batch command first", file=sys.stderr)
+        return 1
+
+    results = index.search(color, args.k)
+    if args.json:
+        print(json.dumps(results, separators=(",", ":")))
+    else:
+        for result in results:
+            print(f"{result['distance']:7.2f}  {result['match']}  {result['path']}")
+    return 0
+
+
+def run_duplicates(args: argparse.Namespace) -> int:
+    """Print near-duplicate clusters of library wallpapers for a duplicates command."""
+    import json
+
+    from dedup import duplicate_clusters
+    from library import LibraryIndex
+
+    records = LibraryIndex().records
+    signatures = {
+        path: record["signature"] for path, record in records.items() if "signature" in record
+    }
+    clusters = duplicate_clusters(signatures, args.threshold)
+
+    if args.json:
+        print(json.dumps(clusters, separators=(",", ":")))
+        return 0
+
+    for i, cluster in enumerate(clusters, 1):
+        print(f"Cluster {i} ({len(cluster)} images):")
+        for path in cluster:
+            print(f"  {path}")
+    unsigned = len(records) - len(signatures)
+    if unsigned:
+        print(f"{unsigned} images not checked; run the batch command to index them")
+    print(
+        f"Done. {sum(len(c) for c in clusters)} of {len(signatures)} images "
+        f"are in {len(clusters)} duplicate clusters."
+    )
+    return 0
+
+
+def run_preview(args: argparse.Namespace) -> int:
+    """Print (or write) previews of every scheme for a preview command."""
+    import json
+
+    from cache import write_json_atomic
+    from preview import preview_schemes
+
+    image_path = Path(args.path).expanduser().resolve()
+
+    if not image_path.exists():
+        print(f"Error: Image not found: {image_path}", file=sys.stderr)
+        return 1
+
+    document = preview_schemes(
+        image_path,
+        contrasts=args.contrast,
+        roles=args.roles.split(",") if args.roles else None,
+        jobs=args.jobs,
+        cache=None if args.no_cache else ColorCache(),
+    )
+
+    if args.output:
+        write_json_atomic(Path(args.output).expanduser(), document)
+    else:
+        print(json.dumps(document, separators=(",", ":")))
+    return 0
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    """Re-apply the current theme whenever its wallpaper or a template changes."""
+    from prerender import RenderedStore
+    from templates import TEMPLATE_OUTPUTS, TEMPLATES_DIR
+    from watch import debounced, open_watcher
+
+    store = RenderedStore()
+    current = store.current()
+    if current is None:
+        print("Error: No theme applied yet; run the image command first", file=sys.stderr)
+        return 1
+
+    watcher = open_watcher(args.poll_interval, polling=args.poll)
+    store.root.mkdir(parents=True, exist_ok=True)
+    watcher.watch(TEMPLATES_DIR)
+    watcher.watch(store.root, {"current.json"})
+    image_path = Path(current["image"])
+    watcher.watch(image_path.parent, {image_path.name})
+    print(f"Watching {image_path} and {TEMPLATES_DIR} ({watcher.kind})", flush=True)
+
+    try:
+        for changed in debounced(watcher, args.debounce / 1000):
+            # Another wallpaper was applied: follow it
+            latest = store.current()
+            if latest and latest["image"] != str(image_path):
+                image_path = Path(latest["image"])
+                watcher.watch(image_path.parent, {image_path.name})
+                print(f"Watching {image_path}", flush=True)
+
+            templates = sorted(
+                p.name
+                for p in changed
+                if p.parent == TEMPLATES_DIR and p.name in TEMPLATE_OUTPUTS
+            )
+            if image_path in changed and image_path.exists():
+                rerun_current(args, None)
+            elif templates:
+                rerun_current(args, templates)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+def rerun_current(args: argparse.Namespace, templates: list[str] | None) -> None:
+    """
+    Re-apply the current theme for watch.
+
+    Args:
+        args: Watch arguments (hooks and verbosity)
+        templates: Template names to re-render from the cached scheme, or
+            None to regenerate everything (the wallpaper changed)
+    """
+    from prerender import RenderedStore
+    from templates import TEMPLATE_OUTPUTS, render_all, render_template
+
+    # Wait for running image/apply/mode commands without superseding them;
+    # if one is still queued it applies the change anyway
+    try:
+        with RunLock(latest_ticket()):
+            current = RenderedStore().current()
+            image_path = Path(current["image"])
+            mode = current["mode"]
+            cache = ColorCache()
+
+            started = time.perf_counter()
+            colors = generate_scheme(
+                image_path, mode, current["scheme"], current["contrast"], cache
+            )
+            if templates is None:
+                rendered = render_all(colors, str(image_path), mode)
+                record_current(image_path, mode, current["scheme"], current["contrast"], cache)
+            else:
+                rendered = {}
+                for name in templates:
+                    try:
+                        text = render_template(name, colors, str(image_path), mode)
+                    except Exception as e:
+                        print(f"Error rendering {name}: {e}", flush=True)
+                        continue
+                    rendered.update(dict.fromkeys(TEMPLATE_OUTPUTS[name], text))
+
+            written = write_rendered(rendered, mode, args)
+    except Superseded:
+        return
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", flush=True)
+        return
+
+    changed = "wallpaper" if templates is None else ", ".join(templates)
+    print(
+        f"Updated for {changed}: wrote {len(written['changed'])} files "
+        f"({len(written['unchanged'])} unchanged) in "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms.",
+        flush=True,
+    )
+
+
+def run_single_flight(handler, args: argparse.Namespace) -> int:
+    """
+    Run an output-writing command under the run lock.
+
+    Requests superseded by a newer one before they get to write outputs
+    are dropped (exit 0), so only the latest selection is applied.
+    """
+    ticket = args.ticket if args.ticket is not None else take_ticket()
+    try:
+        with RunLock(ticket) as run:
+            return handler(args, run)
+    except Superseded:
+        print("Skipped: superseded by a newer request.")
+        return 0
+
+
+def run_instrumented(handler, args: argparse.Namespace) -> int:
+    """Run a command handler, recording timings and/or a profile if requested."""
+    if args.timings:
+        timings.enable()
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        return handler(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_path = Path(args.profile).expanduser()
+            profiler.dump_stats(profile_path)
+            print(f"Wrote profile to: {profile_path}", file=sys.stderr)
+        if args.timings:
+            timings.print_report(timings.report(), args.timings)
+            timings.disable()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    handlers = {
+        "image": run_image,
+        "apply": run_apply,
+        "mode": run_mode,
+        "preview": run_preview,
+        "search": run_search,
+        "duplicates": run_duplicates,
+        "batch": run_batch_command,
+    }
+    if args.command in SINGLE_FLIGHT_COMMANDS:
+        return run_instrumented(partial(run_single_flight, handlers[args.command]), args)
+    if args.command in handlers:
+        return run_instrumented(handlers[args.command], args)
+
+    if args.command == "watch":
+        return run_watch(args)
+
+    if args.command == "serve":
+        from daemon import serve
+
+        return serve(args.socket, main, verbose=args.verbose)
+
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
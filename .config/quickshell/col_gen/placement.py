@@ -0,0 +1,249 @@
+"""
+Widget placement on a calmness score grid.
+
+Two strategies:
+  greedy   place widgets one by one in the given order, each at its best
+           free position (the original behaviour, order dependent)
+  optimal  branch-and-bound over all widgets at once, minimizing the sum
+           of the widgets' mean scores, seeded with the best greedy
+           solution and stopped after a time budget
+
+Overlap checks use the grid's occupied cells as one integer bitmask and a
+precomputed footprint mask per candidate position, so testing, placing
+and removing a widget are each a single integer operation regardless of
+widget or grid size.
+"""
+
+import time
+from typing import TYPE_CHECKING
+
+# numpy is imported by the functions that need it, so the constants below
+# are cheap to import (main.py uses them for its argument parser)
+if TYPE_CHECKING:
+    import numpy as np
+
+STRATEGIES = ("greedy", "optimal")
+
+# Default search time for the optimal strategy, in seconds
+DEFAULT_TIME_BUDGET = 0.2
+
+# Cost of leaving a widget unplaced; far above any real mean score so the
+# solver always prefers placing more widgets
+UNPLACED_COST = 1e12
+
+
+def rect_means(scores: "np.ndarray", width: int, height: int) -> "np.ndarray":
+    """
+    Mean score of every width x height rectangle on the grid.
+
+    Returns:
+        (rows - height + 1, cols - width + 1) array; entry [r, c] is the mean
+        of scores[r : r + height, c : c + width]
+    """
+    import numpy as np
+
+    table = np.zeros((scores.shape[0] + 1, scores.shape[1] + 1))
+    table[1:, 1:] = scores.cumsum(axis=0).cumsum(axis=1)
+
+    sums = (
+        table[height:, width:]
+        - table[:-height, width:]
+        - table[height:, :-width]
+        + table[:-height, :-width]
+    )
+    return sums / (width * height)
+
+
+def footprint(cols: int, x: int, y: int, width: int, height: int) -> int:
+    """Bitmask of a rectangle's cells on a grid cols wide (bit y * cols + x)."""
+    # Python ints: numpy integers would overflow past 64 cells
+    cols, x, y, width, height = map(int, (cols, x, y, width, height))
+    row = (1 << width) - 1
+    mask = 0
+    for _ in range(height):
+        mask = (mask << cols) | row
+    return mask << (y * cols + x)
+
+
+class Occupancy:
+    """Occupied grid cells as a footprint() bitmask."""
+
+    def __init__(self):
+        self.cells = 0
+
+    def is_free(self, mask: int) -> bool:
+        return not self.cells & mask
+
+    def place(self, mask: int) -> None:
+        self.cells |= mask
+
+    def remove(self, mask: int) -> None:
+        self.cells &= ~mask
+
+
+class _Candidates:
+    """
+    All positions for one widget size, sorted by mean score (best first),
+    with their footprint() masks.
+    """
+
+    def __init__(self, scores: "np.ndarray", width: int, height: int):
+        import numpy as np
+
+        rows, cols = scores.shape
+
+        if width < 1 or height < 1 or width > cols or height > rows:
+            self.xs, self.ys, self.costs, self.masks = [], [], [], []
+            self.best = UNPLACED_COST
+            return
+
+        means = rect_means(scores, width, height)
+        # Stable sort keeps row-major order among equal scores, like the
+        # original scan
+        order = np.argsort(means, axis=None, kind="stable")
+        ys, xs = np.divmod(order, means.shape[1])
+        self.xs = xs.tolist()
+        self.ys = ys.tolist()
+        self.costs = means.ravel()[order].tolist()
+        base = footprint(cols, 0, 0, width, height)
+        self.masks = [base << (y * cols + x) for x, y in zip(self.xs, self.ys)]
+        self.best = self.costs[0]
+
+
+def place_greedy(
+    scores: "np.ndarray", sizes: list[tuple[int, int]], order: list[int] | None = None
+) -> tuple[list[tuple[int, int] | None], float]:
+    """
+    Place widgets one at a time, each at its best free position.
+
+    Args:
+        scores: (rows, cols) calmness grid, lower is better
+        sizes: (width, height) per widget
+        order: Placement order as indices into sizes (default: given order)
+
+    Returns:
+        ((x, y) or None per widget in sizes order, total cost)
+    """
+    occupancy = Occupancy()
+    positions: list[tuple[int, int] | None] = [None] * len(sizes)
+    total = 0.0
+
+    for i in order if order is not None else range(len(sizes)):
+        candidates = _Candidates(scores, *sizes[i])
+        for x, y, cost, mask in zip(
+            candidates.xs, candidates.ys, candidates.costs, candidates.masks
+        ):
+            if occupancy.is_free(mask):
+                occupancy.place(mask)
+                positions[i] = (x, y)
+                total += cost
+                break
+        else:
+            total += UNPLACED_COST
+
+    return positions, total
+
+
+def place_optimal(
+    scores: "np.ndarray",
+    sizes: list[tuple[int, int]],
+    time_budget: float = DEFAULT_TIME_BUDGET,
+) -> tuple[list[tuple[int, int] | None], float, bool]:
+    """
+    Minimize the summed mean score of all widgets with branch-and-bound.
+
+    Widgets are branched largest first; each node is bounded by the current
+    cost plus every remaining widget's best overlap-free score. Search stops
+    once time_budget seconds have passed and returns the best solution found.
+
+    Returns:
+        ((x, y) or None per widget in sizes order, total cost,
+         whether the search finished, i.e. the result is optimal)
+    """
+    deadline = time.perf_counter() + time_budget
+    n = len(sizes)
+
+    # Incumbent: the better of greedy in the given order and largest first
+    by_area = sorted(range(n), key=lambda i: -sizes[i][0] * sizes[i][1])
+    best_positions, best_total = min(
+        place_greedy(scores, sizes),
+        place_greedy(scores, sizes, by_area),
+        key=lambda result: result[1],
+    )
+
+    candidates = [_Candidates(scores, *sizes[i]) for i in by_area]
+
+    # bound[k]: optimistic cost of widgets by_area[k:]
+    bound = [0.0] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        bound[k] = bound[k + 1] + candidates[k].best
+
+    occupancy = Occupancy()
+    current: list[tuple[int, int] | None] = [None] * n
+    finished = True
+
+    def search(k: int, total: float) -> None:
+        nonlocal best_total, best_positions, finished
+
+        if k == n:
+            if total < best_total:
+                best_total = total
+                best_positions = [None] * n
+                for slot, i in enumerate(by_area):
+                    best_positions[i] = current[slot]
+            return
+
+        if time.perf_counter() > deadline:
+            finished = False
+            return
+
+        cand = candidates[k]
+        placed_any = False
+        pruned = False
+        for x, y, cost, mask in zip(cand.xs, cand.ys, cand.costs, cand.masks):
+            if total + cost + bound[k + 1] >= best_total:
+                # Costs are sorted, nothing further down can do better
+                pruned = True
+                break
+            if not occupancy.is_free(mask):
+                continue
+            placed_any = True
+            occupancy.place(mask)
+            current[k] = (x, y)
+            search(k + 1, total + cost)
+            occupancy.remove(mask)
+            current[k] = None
+            if not finished:
+                return
+
+        if not placed_any and not pruned:
+            # No free position at all: leave this widget out
+            search(k + 1, total + UNPLACED_COST)
+
+    search(0, 0.0)
+    return best_positions, best_total, finished
+
+
+def place_widgets(
+    scores: "np.ndarray",
+    sizes: list[tuple[int, int]],
+    strategy: str = "optimal",
+    time_budget: float = DEFAULT_TIME_BUDGET,
+) -> list[tuple[int, int] | None]:
+    """
+    Place widgets on the score grid.
+
+    Args:
+        scores: (rows, cols) calmness grid, lower is better
+        sizes: (width, height) per widget
+        strategy: "greedy" or "optimal"
+        time_budget: Seconds the optimal search may take
+
+    Returns:
+        (x, y) or None (could not place) per widget, in sizes order
+    """
+    if strategy == "greedy":
+        return place_greedy(scores, sizes)[0]
+    if strategy == "optimal":
+        return place_optimal(scores, sizes, time_budget)[0]
+    raise ValueError(f"Unknown placement strategy: {strategy}")
@@ -0,0 +1,154 @@
+"""
+Pre-rendered template outputs for both color modes.
+
+`image --both-modes` renders every template for dark and light and keeps
+both sets, so a later mode switch (`mode light`, or a scheduled one) only
+writes the stored files and fires hooks, without decoding the image or
+rendering anything.
+
+Layout under $XDG_CACHE_HOME/col_gen/rendered:
+    current.json                       last applied {"image", "key", "scheme", "contrast", "mode"}
+    <hash>-<scheme>-<contrast>.<mode>.json
+                                       {"image", "templates_mtime", "outputs": {output: text}}
+
+A stored set is only used while the image path and the template files are
+unchanged. Only the MAX_SETS most recently used image/scheme/contrast
+combinations are kept.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from cache import cache_dir, write_json_atomic
+
+# Image/scheme/contrast combinations kept (each holds one file per mode)
+MAX_SETS = 8
+
+
+def templates_mtime(templates_dir: Path) -> int:
+    """Newest modification time of the template sources, in ns."""
+    try:
+        return max((p.stat().st_mtime_ns for p in templates_dir.iterdir()), default=0)
+    except OSError:
+        return 0
+
+
+class RenderedStore:
+    """Mode-suffixed rendered outputs keyed by image hash, scheme and contrast."""
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root else cache_dir() / "rendered"
+
+    @staticmethod
+    def set_key(image_hash: str, scheme_type: str, contrast: float) -> str:
+        return f"{image_hash}-{scheme_type}-{float(contrast):g}"
+
+    def _path(self, key: str, mode: str) -> Path:
+        return self.root / f"{key}.{mode}.json"
+
+    def load(
+        self, key: str, mode: str, image_path: str, templates_dir: Path
+    ) -> dict[str, str] | None:
+        """
+        Rendered outputs for key in mode.
+
+        Returns:
+            {output path: text} as from render_all, or None if missing or stale
+        """
+        path = self._path(key, mode)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if stored.get("image") != image_path:
+            return None
+        if stored.get("templates_mtime") != templates_mtime(templates_dir):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return stored.get("outputs")
+
+    def save(
+        self,
+        key: str,
+        mode: str,
+        image_path: str,
+        templates_dir: Path,
+        rendered: dict[str, str],
+    ) -> None:
+        """Store rendered outputs for key in mode."""
+        try:
+            write_json_atomic(
+                self._path(key, mode),
+                {
+                    "image": image_path,
+                    "templates_mtime": templates_mtime(templates_dir),
+                    "outputs": rendered,
+                },
+            )
+        except OSError as e:
+            print(f"Error writing pre-rendered outputs: {e}")
+
+    def current(self) -> dict | None:
+        """What was applied last: {"image", "key", "scheme", "contrast", "mode"}."""
+        try:
+            with open(self.root / "current.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set_current(
+        self, image_path: str, key: str, scheme_type: str, contrast: float, mode: str
+    ) -> None:
+        try:
+            write_json_atomic(
+                self.root / "current.json",
+                {
+                    "image": image_path,
+                    "key": key,
+                    "scheme": scheme_type,
+                    "contrast": contrast,
+                    "mode": mode,
+                },
+            )
+        except OSError as e:
+            print(f"Error writing {self.root / 'current.json'}: {e}")
+
+    def prune(self, keep: int = MAX_SETS) -> int:
+        """
+        Remove all but the keep most recently used sets.
+
+        Returns:
+            Number of files removed
+        """
+        try:
+            files = [
+                (p.stat().st_mtime_ns, p)
+                for p in self.root.glob("*.json")
+                if p.name != "current.json"
+            ]
+        except OSError:
+            return 0
+
+        # Newest use of any mode file counts for the whole set
+        last_used: dict[str, int] = {}
+        for mtime, p in files:
+            key = p.name.rsplit(".", 2)[0]
+            last_used[key] = max(last_used.get(key, 0), mtime)
+
+        stale = set(sorted(last_used, key=last_used.get, reverse=True)[keep:])
+        removed = 0
+        for _, p in files:
+            if p.name.rsplit(".", 2)[0] in stale:
+                try:
+                    p.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,132 @@
+"""
+Scheme previews (col_gen preview).
+
+Extracts an image's seed once and computes every scheme in SCHEME_MAP for
+dark and light (and optionally several contrast levels), so the scheme
+picker can show all choices without a generate run per choice:
+
+    {"image": "...", "seed": "#rrggbb",
+     "previews": {"0": {"tonal-spot": {"dark": {"primary": "#rrggbb", ...},
+                                        "light": {...}}, ...}}}
+
+Previews are keyed by contrast (formatted like cache.scheme_key), then
+scheme, then mode. Full color dicts are stored in the ColorCache, so
+applying a previewed scheme afterwards is a cache hit.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from cache import ColorCache, scheme_key
+from colors import (
+    FALLBACK_SEED,
+    SCHEME_MAP,
+    argb_to_hex,
+    copy_duplicate_seed,
+    scheme_colors,
+    seed_candidates_from_pixels,
+    seed_thumbnail,
+)
+
+MODES = ("dark", "light")
+
+# Seed as Hct, built once per worker process by _init_worker
+_source_hct = None
+
+
+def _init_worker(seed: int) -> None:
+    global _source_hct
+    from materialyoucolor.hct import Hct
+
+    _source_hct = Hct.from_int(seed)
+
+
+def _scheme_worker(mode: str, scheme_type: str, contrast: float) -> dict:
+    from colors import generate_scheme_from_hct, scheme_argb
+
+    return scheme_argb(generate_scheme_from_hct(_source_hct, mode, scheme_type, contrast))
+
+
+def _compute(
+    seed: int, pending: list[tuple[str, str, float]], jobs: int
+) -> list[dict]:
+    """Compute role -> ARGB dicts for (mode, scheme, contrast) tasks, in task order."""
+    if jobs == 1 or len(pending) <= 1:
+        _init_worker(seed)
+        return [_scheme_worker(*task) for task in pending]
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(seed,)
+    ) as pool:
+        return list(pool.map(_scheme_worker, *zip(*pending)))
+
+
+def preview_schemes(
+    image_path: str | Path,
+    contrasts: list[float] | None = None,
+    roles: list[str] | None = None,
+    jobs: int | None = None,
+    cache: ColorCache | None = None,
+) -> dict:
+    """
+    Compute every scheme x mode (x contrast) for an image.
+
+    Args:
+        image_path: Path to source image
+        contrasts: Contrast levels (default: [0.0])
+        roles: Color names to include (default: all)
+        jobs: Worker processes (default: CPU count, 1 runs in-process)
+        cache: Optional ColorCache; supplies the seed and already generated
+            schemes, and receives the new ones
+
+    Returns:
+        Preview document (see module docstring)
+    """
+    contrasts = contrasts or [0.0]
+
+    if cache is not None:
+        key = cache.image_key(image_path)
+        entry = cache.get(key) or {}
+    else:
+        key, entry = None, {}
+
+    if "seed" not in entry:
+        img = seed_thumbnail(image_path)
+        if cache is None or not copy_duplicate_seed(entry, cache, key, img):
+            candidates = seed_candidates_from_pixels(img)
+            entry["seed"] = candidates[0] if candidates else FALLBACK_SEED
+            entry["candidates"] = candidates
+    seed = entry["seed"]
+    schemes = entry.setdefault("schemes", {})
+
+    tasks = [
+        (mode, scheme_type, contrast)
+        for contrast in contrasts
+        for scheme_type in SCHEME_MAP
+        for mode in MODES
+    ]
+    pending = [task for task in tasks if scheme_key(*task) not in schemes]
+
+    if pending:
+        jobs = min(jobs or os.cpu_count() or 1, len(pending))
+        for task, colors in zip(pending, _compute(seed, pending, jobs)):
+            schemes[scheme_key(*task)] = colors
+        if cache is not None:
+            cache.put(key, entry)
+
+    previews: dict = {}
+    for mode, scheme_type, contrast in tasks:
+        colors = schemes[scheme_key(mode, scheme_type, contrast)]
+        by_scheme = previews.setdefault(f"{float(contrast):g}", {})
+        by_scheme.setdefault(scheme_type, {})[mode] = {
+            name: role.hex
+            for name, role in scheme_colors(colors).items()
+            if roles is None or name in roles
+        }
+
+    return {
+        "image": str(image_path),
+        "seed": argb_to_hex(seed),
+        "previews": previews,
+    }
@@ -0,0 +1,140 @@
+"""
+Push color updates to running Quickshell components.
+
+Without this, every theme change rewrites the Colors.json copies and each
+component's FileView re-reads and re-parses its file. A component that
+subscribes instead listens on its own Unix socket in the runtime directory
+
+    $XDG_RUNTIME_DIR/col_gen.sub.<name>.sock
+
+and col_gen sends it one JSON line per change, before the files are
+written:
+
+    {"type": "colors", "mode": "dark", "colors": {...}, "changed": [...]}
+
+colors is the complete qs_json.js map (the Colors.json contents), changed
+the keys that differ from the Colors.json currently on disk, so
+subscribers only need to update those. Nothing is sent when no role
+changed.
+
+The files are still written and subscribers keep watching them. A push
+that fails or times out is not retried, and other tools may write
+Colors.json too; the file watch is what brings a subscriber back in line
+with the disk (which the next diff is taken against) in both cases.
+Non-subscribers (the lock screen, the menu) only watch their files.
+Sockets whose listener is gone are removed. Standard library only.
+"""
+
+import json
+import socket
+from pathlib import Path
+
+from runlock import runtime_path
+from timings import span
+
+# Template whose rendered map is published
+PUBLISHED_TEMPLATE = "qs_json.js"
+
+# Per-subscriber send timeout (s); a stuck subscriber must not stall a run
+SEND_TIMEOUT = 0.5
+
+
+def subscriber_path(name: str) -> Path:
+    """Socket a subscriber called name listens on."""
+    return runtime_path(f"sub.{name}.sock")
+
+
+def subscriber_sockets() -> list[Path]:
+    """Sockets of all subscribers (listening or stale)."""
+    pattern = subscriber_path("*")
+    return sorted(pattern.parent.glob(pattern.name))
+
+
+def send(path: Path, data: bytes) -> bool:
+    """
+    Deliver data to one subscriber socket.
+
+    Returns:
+        True if sent; False if nobody is listening (a stale socket is
+        removed) or the send failed
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(SEND_TIMEOUT)
+        try:
+            sock.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            path.unlink(missing_ok=True)
+            return False
+        except OSError:
+            return False
+        try:
+            sock.sendall(data)
+        except OSError as e:
+            print(f"Error publishing to {path}: {e}")
+            return False
+    return True
+
+
+def publish(message: dict, sockets: list[Path] | None = None) -> int:
+    """
+    Send message as one JSON line to every subscriber.
+
+    Returns:
+        Number of subscribers it was delivered to
+    """
+    if sockets is None:
+        sockets = subscriber_sockets()
+    if not sockets:
+        return 0
+    data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+    return sum(send(path, data) for path in sockets)
+
+
+def color_update(rendered: dict[str, str], mode: str) -> dict | None:
+    """
+    Build the update message for rendered outputs.
+
+    Args:
+        rendered: output path -> rendered text (as passed to write_outputs)
+        mode: "dark" or "light"
+
+    Returns:
+        The message, or None if the published template is not among the
+        outputs or no role changed
+    """
+    from templates import TEMPLATE_OUTPUTS, expand_path
+
+    output = TEMPLATE_OUTPUTS[PUBLISHED_TEMPLATE][0]
+    text = rendered.get(output)
+    if text is None:
+        return None
+    try:
+        colors = json.loads(text)
+    except ValueError as e:
+        print(f"Error publishing colors: {e}")
+        return None
+
+    try:
+        current = json.loads(expand_path(output).read_text())
+    except (OSError, ValueError):
+        current = {}
+    changed = [key for key, value in colors.items() if current.get(key) != value]
+    if not changed:
+        return None
+    return {"type": "colors", "mode": mode, "colors": colors, "changed": changed}
+
+
+def publish_colors(rendered: dict[str, str], mode: str) -> int:
+    """
+    Publish the color map of rendered outputs to all subscribers. Call it
+    before writing the outputs (the diff is taken against the files).
+
+    Returns:
+        Number of subscribers reached
+    """
+    sockets = subscriber_sockets()
+    if not sockets:
+        return 0
+    with span("publish"):
+        message = color_update(rendered, mode)
+        return publish(message, sockets) if message else 0
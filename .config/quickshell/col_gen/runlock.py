@@ -0,0 +1,117 @@
+"""
+Single-flight coordination of theme-applying runs.
+
+Scrolling through wallpapers starts a new image/apply run per step. Runs
+take a ticket from a shared counter as soon as they start, then wait on an
+exclusive run lock. Only the holder of the newest ticket is worth
+finishing:
+
+  - a run that gets the lock after a newer ticket was issued drops out
+    without doing any work
+  - a running one checks for a newer ticket before it writes outputs, so
+    the theme on disk and the hooks fired always match the last selection
+
+Both files live in $XDG_RUNTIME_DIR (or the temp dir), shared by
+in-process runs and the daemon. Standard library only, so client.py can
+take tickets before forwarding to the daemon.
+"""
+
+import fcntl
+import os
+import tempfile
+from pathlib import Path
+
+# Subcommands that write outputs and run hooks
+SINGLE_FLIGHT_COMMANDS = {"image", "apply", "mode"}
+
+
+class Superseded(Exception):
+    """A newer request was issued; this run should stop without writing."""
+
+
+def runtime_path(name: str) -> Path:
+    """Per-user path for a col_gen runtime file (see client.socket_path)."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / f"col_gen.{name}"
+    return Path(tempfile.gettempdir()) / f"col_gen-{os.getuid()}.{name}"
+
+
+def _open_ticket_file() -> int:
+    return os.open(runtime_path("ticket"), os.O_RDWR | os.O_CREAT, 0o600)
+
+
+def _read_ticket(fd: int) -> int:
+    os.lseek(fd, 0, os.SEEK_SET)
+    try:
+        return int(os.read(fd, 32) or 0)
+    except ValueError:
+        return 0
+
+
+def take_ticket() -> int:
+    """Issue the next ticket; it becomes the latest request."""
+    fd = _open_ticket_file()
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        ticket = _read_ticket(fd) + 1
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(ticket).encode())
+        return ticket
+    finally:
+        os.close(fd)
+
+
+def latest_ticket() -> int:
+    """Most recently issued ticket (0 if none yet)."""
+    fd = _open_ticket_file()
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        return _read_ticket(fd)
+    finally:
+        os.close(fd)
+
+
+class RunLock:
+    """
+    Exclusive lock for one ticketed run.
+
+    Entering blocks until no other run holds the lock, then raises
+    Superseded if a newer ticket was issued meanwhile.
+
+        with RunLock(take_ticket()) as run:
+            colors = ...
+            run.checkpoint()  # raises Superseded
+            write_outputs(...)
+    """
+
+    def __init__(self, ticket: int):
+        self.ticket = ticket
+        self._fd: int | None = None
+
+    def superseded(self) -> bool:
+        return latest_ticket() > self.ticket
+
+    def checkpoint(self) -> None:
+        """Raise Superseded if a newer request has been issued."""
+        if self.superseded():
+            raise Superseded(f"ticket {self.ticket} superseded")
+
+    def __enter__(self) -> "RunLock":
+        self._fd = os.open(runtime_path("lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self.checkpoint()
+        except Superseded:
+            self._release()
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
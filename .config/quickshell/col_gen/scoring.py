@@ -0,0 +1,101 @@
+"""
+NumPy port of materialyoucolor's Score.score.
+
+The upstream scorer spends most of its time in pure-Python loops: spreading
+hue populations over a 30 degree window (360 x 30 iterations) and re-running
+the greedy hue-distinct selection for every threshold from 90 down to 15
+degrees. Both are vectorized here while keeping the same floating point
+summation order, so the result is identical to Score.score of the
+materialyoucolor version pinned in uv.lock.
+"""
+
+import numpy as np
+from materialyoucolor.hct import Hct
+from materialyoucolor.score.score import Score
+
+# For every hue n, the hues whose +-15 degree window covers n, in the
+# ascending order Score.score adds their proportions in.
+_EXCITED_SOURCES = np.array(
+    [sorted((n + d) % 360 for d in range(-15, 15)) for n in range(360)]
+).T
+
+
+def score_colors(
+    colors_to_population: dict[int, int],
+    desired: int = 4,
+    fallback_color_argb: int = 0xFF4285F4,
+    filter_enabled: bool = True,
+) -> list[int]:
+    """
+    Rank quantized colors for use as a theme source (same result as Score.score).
+
+    Args:
+        colors_to_population: Quantizer output, ARGB int -> pixel count
+        desired: Maximum number of hue-distinct colors to return
+        fallback_color_argb: Returned when no color passes the filter
+        filter_enabled: Drop low-chroma and rare-hue colors
+
+    Returns:
+        ARGB ints, best first
+    """
+    colors_hct = []
+    hue_population = np.zeros(360, dtype=np.int64)
+    population_sum = 0
+
+    for argb, population in colors_to_population.items():
+        hct = Hct.from_int(argb)
+        colors_hct.append(hct)
+        hue_population[int(hct.hue)] += population
+        population_sum += population
+
+    if not population_sum:
+        return [fallback_color_argb]
+
+    proportions = hue_population / population_sum
+    hue_excited_proportions = np.zeros(360)
+    for sources in _EXCITED_SOURCES:
+        hue_excited_proportions += proportions[sources]
+
+    scored_hct = []
+    for hct in colors_hct:
+        proportion = hue_excited_proportions[round(hct.hue) % 360]
+
+        if filter_enabled and (
+            hct.chroma < Score.CUTOFF_CHROMA
+            or proportion <= Score.CUTOFF_EXCITED_PROPORTION
+        ):
+            continue
+
+        proportion_score = float(proportion) * 100.0 * Score.WEIGHT_PROPORTION
+        chroma_weight = (
+            Score.WEIGHT_CHROMA_BELOW
+            if hct.chroma < Score.TARGET_CHROMA
+            else Score.WEIGHT_CHROMA_ABOVE
+        )
+        chroma_score = (hct.chroma - Score.TARGET_CHROMA) * chroma_weight
+        scored_hct.append((proportion_score + chroma_score, hct))
+
+    # Stable, like list.sort(reverse=True) upstream
+    scored_hct.sort(key=lambda item: item[0], reverse=True)
+
+    if not scored_hct:
+        return [fallback_color_argb]
+
+    hues = np.array([hct.hue for _, hct in scored_hct])
+    distances = 180.0 - np.abs(np.abs(hues[:, None] - hues[None, :]) - 180.0)
+
+    chosen: list[int] = []
+    for min_difference in range(90, 14, -1):
+        chosen = []
+        allowed = np.ones(len(hues), dtype=bool)
+        while len(chosen) < desired:
+            candidates = np.flatnonzero(allowed)
+            if not len(candidates):
+                break
+            index = int(candidates[0])
+            chosen.append(index)
+            allowed &= distances[index] >= min_difference
+        if len(chosen) >= desired:
+            break
+
+    return [scored_hct[i][1].to_int() for i in chosen]
@@ -0,0 +1,202 @@
+"""
+Color-similarity search over the wallpaper library (col_gen search).
+
+Every library record keeps its scored seed candidates (up to 4 ARGB
+colors, best first; see library.py). Their CAM16-UCS coordinates - J*, a*,
+b*, the space HCT color distances are measured in - are kept as arrays in
+$XDG_CACHE_HOME/col_gen/color_index.npz, so a query is one vectorized
+distance computation and never decodes an image:
+
+    coords  (M, 3) float64  J*, a*, b* of every candidate
+    owner   (M,)   int32    index into paths
+    rank    (M,)   int8     0 for the seed, 1.. for the other candidates
+    argb    (M,)   uint32   the candidate colors
+    paths   (N,)   str      wallpaper paths
+    source  (2,)   int64    mtime_ns and size of the library.jsonl it was built from
+
+The index is rebuilt when library.jsonl changed since (after a batch run).
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from cache import cache_dir
+from library import LibraryIndex
+from timings import span
+
+
+def parse_color(text: str) -> int:
+    """
+    Parse "#rrggbb" or "rrggbb" to an opaque ARGB int.
+
+    Raises:
+        ValueError: Not a 6 digit hex color
+    """
+    digits = text.strip().removeprefix("#")
+    if len(digits) != 6:
+        raise ValueError(f"Expected a #rrggbb color, got {text!r}")
+    return 0xFF000000 | int(digits, 16)
+
+
+def ucs_coordinates(colors: list[int]) -> np.ndarray:
+    """CAM16-UCS (J*, a*, b*) of ARGB colors as an (N, 3) array."""
+    from materialyoucolor.hct.cam16 import Cam16
+
+    cams = [Cam16.from_int(argb) for argb in colors]
+    coords = np.array([(c.jstar, c.astar, c.bstar) for c in cams], dtype=np.float64)
+    return coords.reshape(-1, 3)
+
+
+def _source_stamp(path: Path) -> tuple[int, int]:
+    try:
+        st = path.stat()
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ColorIndex:
+    """Seed candidates of every library wallpaper in CAM16-UCS, searchable by color."""
+
+    def __init__(
+        self,
+        paths: list[str],
+        coords: np.ndarray,
+        owner: np.ndarray,
+        rank: np.ndarray,
+        argb: np.ndarray,
+        source: tuple[int, int] = (0, 0),
+    ):
+        self.paths = paths
+        self.coords = coords
+        self.owner = owner
+        self.rank = rank
+        self.argb = argb
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @classmethod
+    def build(cls, library: LibraryIndex) -> "ColorIndex":
+        """Convert every record's candidates (or its seed) to UCS coordinates."""
+        paths, colors, owner, rank = [], [], [], []
+        for record in library.records.values():
+            candidates = record.get("candidates") or [record["seed"]]
+            for i, argb in enumerate(candidates):
+                colors.append(argb)
+                owner.append(len(paths))
+                rank.append(i)
+            paths.append(record["path"])
+
+        with span("search.build"):
+            coords = ucs_coordinates(colors)
+        return cls(
+            paths,
+            coords,
+            np.array(owner, dtype=np.int32),
+            np.array(rank, dtype=np.int8),
+            np.array(colors, dtype=np.uint32),
+            _source_stamp(library.path),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ColorIndex | None":
+        """Load a saved index, or None if missing or unreadable."""
+        try:
+            with np.load(path) as data:
+                return cls(
+                    data["paths"].tolist(),
+                    data["coords"],
+                    data["owner"],
+                    data["rank"],
+                    data["argb"],
+                    tuple(int(v) for v in data["source"]),
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path: str | Path) -> None:
+        """Write the index (atomically replacing any previous one)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            paths=np.array(self.paths, dtype=str),
+            coords=self.coords,
+            owner=self.owner,
+            rank=self.rank,
+            argb=self.argb,
+            source=np.array(self.source, dtype=np.int64),
+        )
+        tmp.replace(path)
+
+    def search(self, color: int, k: int = 20) -> list[dict]:
+        """
+        Wallpapers whose closest candidate is nearest to color.
+
+        Args:
+            color: ARGB query color
+            k: Number of wallpapers to return
+
+        Returns:
+            Up to k {"path", "distance", "match", "rank"}, nearest first.
+            distance is Cam16.distance of the query and the matching
+            candidate (match, a #rrggbb hex; rank 0 is the wallpaper's seed).
+        """
+        from colors import argb_to_hex
+
+        if not len(self.owner) or k <= 0:
+            return []
+
+        with span("search.query"):
+            delta = self.coords - ucs_coordinates([color])[0]
+            squared = np.einsum("ij,ij->i", delta, delta)
+
+            # Nearest candidate per wallpaper: sort candidates by distance
+            # (seed first on ties) and keep each owner's first occurrence
+            order = np.lexsort((self.rank, squared))
+            _, first = np.unique(self.owner[order], return_index=True)
+            best = order[np.sort(first)[:k]]
+
+        return [
+            {
+                "path": self.paths[self.owner[i]],
+                # Same scale as Cam16.distance / colors.seed_distance
+                "distance": round(1.41 * float(squared[i]) ** 0.315, 3),
+                "match": argb_to_hex(int(self.argb[i])),
+                "rank": int(self.rank[i]),
+            }
+            for i in best
+        ]
+
+
+def index_path() -> Path:
+    return cache_dir() / "color_index.npz"
+
+
+def load_color_index(
+    library: LibraryIndex | None = None, path: str | Path | None = None
+) -> ColorIndex:
+    """
+    The saved color index, rebuilt and saved first if library.jsonl changed.
+
+    Args:
+        library: Library index (default: the user index)
+        path: Color index file (default: $XDG_CACHE_HOME/col_gen/color_index.npz)
+    """
+    path = Path(path) if path else index_path()
+    library_path = library.path if library else LibraryIndex.default_path()
+
+    index = ColorIndex.load(path)
+    if index is not None and index.source == _source_stamp(library_path):
+        return index
+
+    index = ColorIndex.build(library or LibraryIndex(library_path))
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"Error writing color index: {e}")
+    return index
@@ -4,8 +4,20 @@ Jinja2 template rendering for color configs.
 
 import os
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, BaseLoader
+from jinja2 import (
+    BaseLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    Template,
+    TemplateNotFound,
+)
+
+from cache import cache_dir
+from colors import COLOR_FILTERS
+from timings import span
 
 TEMPLATES_DIR = Path(__file__).parent / "templates"
 
@@ -28,6 +40,9 @@ TEMPLATE_OUTPUTS = {
     "zwm_colors.lua": ["~/.config/zwm/colors.lua"],
 }
 
+# Upper bound on concurrent output writes
+MAX_WRITERS = 8
+
 
 def expand_path(path: str) -> Path:
     """Expand ~ and env vars in path."""
@@ -41,6 +56,7 @@ def convert_matugen_syntax(template_content: str) -> str:
     Matugen uses:
       {{colors.<name>.default.hex}} -> {{ colors.<name>.hex }}
       {{colors.<name>.default.hex_stripped}} -> {{ colors.<name>.hex_stripped }}
+      (likewise .rgb, .rgba, .hsl and .hct, see colors.ColorRole)
       {{image}} -> {{ image }}
       {{mode}} -> {{ mode }}
       <* for name, value in colors *> -> {% for name, value in colors.items() %}
@@ -60,14 +76,16 @@ def convert_matugen_syntax(template_content: str) -> str:
     # Convert color references with .default.: colors.name.default.hex -> colors.name.hex
     # This handles both {{ colors.name.default.hex }} and {{colors.name.default.hex}}
     content = re.sub(
-        r"\{\{\s*colors\.([a-z_]+)\.default\.(hex(?:_stripped)?)\s*\}\}",
+        r"\{\{\s*colors\.([a-z_]+)\.default\.(hex(?:_stripped)?|rgba?|hsl|hct)\s*\}\}",
         r"{{ colors.\1.\2 }}",
         content,
     )
 
     # Convert loop variable refs: value.default.hex -> value.hex
     content = re.sub(
-        r"\{\{\s*(\w+)\.default\.(hex(?:_stripped)?)\s*\}\}", r"{{ \1.\2 }}", content
+        r"\{\{\s*(\w+)\.default\.(hex(?:_stripped)?|rgba?|hsl|hct)\s*\}\}",
+        r"{{ \1.\2 }}",
+        content,
     )
 
     # Convert simple vars (without adding extra spaces if already spaced)
@@ -80,6 +98,102 @@ def convert_matugen_syntax(template_content: str) -> str:
     return content
 
 
+class MatugenLoader(BaseLoader):
+    """
+    Loads templates from a directory, converting matugen syntax on load.
+
+    Templates are reported up to date while their file's mtime is unchanged,
+    so a long-running Environment only reloads edited templates.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def get_source(self, environment, template):
+        path = self.directory / template
+        try:
+            mtime = path.stat().st_mtime_ns
+            raw_content = path.read_text()
+        except OSError:
+            raise TemplateNotFound(template)
+
+        def uptodate() -> bool:
+            try:
+                return path.stat().st_mtime_ns == mtime
+            except OSError:
+                return False
+
+        return convert_matugen_syntax(raw_content), str(path), uptodate
+
+    def list_templates(self):
+        return sorted(p.name for p in self.directory.iterdir() if p.is_file())
+
+
+_env: Environment | None = None
+
+
+def get_environment() -> Environment:
+    """
+    Shared Jinja environment for all templates.
+
+    Compiled templates are kept in memory (reloaded when their file changes)
+    and their bytecode on disk under $XDG_CACHE_HOME/col_gen/templates, keyed
+    by a checksum of the converted source, so cold runs skip compilation too.
+    """
+    global _env
+    if _env is None:
+        bytecode_cache = None
+        bytecode_dir = cache_dir() / "templates"
+        try:
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+        except OSError as e:
+            print(f"Error creating template cache: {e}")
+
+        _env = Environment(
+            loader=MatugenLoader(TEMPLATES_DIR),
+            bytecode_cache=bytecode_cache,
+            auto_reload=True,
+        )
+        _env.filters.update(COLOR_FILTERS)
+    return _env
+
+
+def load_template(template_name: str) -> Template:
+    """
+    Load a compiled template through the shared environment.
+
+    Args:
+        template_name: Name of template file in templates/
+
+    Returns:
+        Compiled Jinja2 template
+    """
+    try:
+        return get_environment().get_template(template_name)
+    except TemplateNotFound:
+        raise FileNotFoundError(f"Template not found: {TEMPLATES_DIR / template_name}")
+
+
+def preload_templates() -> int:
+    """
+    Compile every template in TEMPLATE_OUTPUTS ahead of the first render.
+
+    Returns:
+        Number of templates compiled
+    """
+    loaded = 0
+    for template_name in TEMPLATE_OUTPUTS:
+        try:
+            load_template(template_name)
+            loaded += 1
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"Error loading {template_name}: {e}")
+    return loaded
+
+
 def render_template(
     template_name: str,
     colors: dict,
@@ -91,24 +205,14 @@ def render_template(
 
     Args:
         template_name: Name of template file in templates/
-        colors: Dict of color names -> {hex, hex_stripped}
+        colors: Dict of color names -> colors.ColorRole
         image_path: Absolute path to source image
         mode: "dark" or "light"
 
     Returns:
         Rendered template string
     """
-    template_path = TEMPLATES_DIR / template_name
-    if not template_path.exists():
-        raise FileNotFoundError(f"Template not found: {template_path}")
-
-    # Read and convert template syntax
-    raw_content = template_path.read_text()
-    jinja_content = convert_matugen_syntax(raw_content)
-
-    # Create Jinja env from string
-    env = Environment(loader=BaseLoader())
-    template = env.from_string(jinja_content)
+    template = load_template(template_name)
 
     return template.render(
         colors=colors,
@@ -136,7 +240,8 @@ def render_all(
             continue
 
         try:
-            rendered = render_template(template_name, colors, image_path, mode)
+            with span("templates.render"):
+                rendered = render_template(template_name, colors, image_path, mode)
             for output_path in output_paths:
                 results[output_path] = rendered
         except Exception as e:
@@ -145,22 +250,91 @@ def render_all(
     return results
 
 
-def write_outputs(rendered: dict[str, str]) -> list[str]:
+def _write_if_changed(path: Path, data: bytes, default_mode: int) -> bool:
+    """
+    Atomically replace path with data unless it already holds exactly data.
+
+    Symlinked outputs are resolved so the link itself is preserved, and an
+    existing file's permissions are kept.
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    path = Path(os.path.realpath(path))
+
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        st = None
+
+    if st is not None and st.st_size == len(data):
+        try:
+            if path.read_bytes() == data:
+                return False
+        except OSError:
+            pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, (st.st_mode & 0o7777) if st is not None else default_mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return True
+
+
+def write_outputs(rendered: dict[str, str]) -> dict[str, list[str]]:
     """
     Write rendered templates to their output paths.
 
+    Identical content shared by several paths is encoded once, outputs that
+    already hold the same bytes are left untouched (so file watchers do not
+    fire), and changed files are replaced atomically via temp file +
+    os.replace. Files are written concurrently.
+
     Returns:
-        List of successfully written paths
+        {"changed": [...], "unchanged": [...], "failed": [...]}, each a list
+        of output paths as given in rendered
     """
-    written = []
+    result = {"changed": [], "unchanged": [], "failed": []}
+    if not rendered:
+        return result
 
+    # Encode each distinct rendered text once
+    encoded: dict[str, bytes] = {}
+    jobs = []
     for output_path, content in rendered.items():
+        data = encoded.get(content)
+        if data is None:
+            data = encoded[content] = content.encode()
+        jobs.append((output_path, data))
+
+    # New files get the usual 0666 & ~umask permissions
+    umask = os.umask(0)
+    os.umask(umask)
+    default_mode = 0o666 & ~umask
+
+    def write(job: tuple[str, bytes]) -> tuple[str, str]:
+        output_path, data = job
         path = expand_path(output_path)
         try:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(content)
-            written.append(str(path))
+            changed = _write_if_changed(path, data, default_mode)
         except Exception as e:
             print(f"Error writing {path}: {e}")
+            return output_path, "failed"
+        return output_path, "changed" if changed else "unchanged"
+
+    with span("templates.write"), ThreadPoolExecutor(
+        max_workers=min(MAX_WRITERS, len(jobs))
+    ) as pool:
+        for output_path, status in pool.map(write, jobs):
+            result[status].append(output_path)
 
-    return written
+    return result
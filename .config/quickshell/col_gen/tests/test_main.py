@@ -0,0 +1,40 @@
+"""End-to-end runs of the main.py subcommands against a throwaway home."""
+
+import pytest
+from PIL import Image
+
+import main
+
+
+@pytest.fixture
+def wallpaper(tmp_path, monkeypatch):
+    """A small two-tone wallpaper, with HOME and the XDG dirs under tmp_path."""
+    for name, sub in [
+        ("HOME", "home"),
+        ("XDG_CACHE_HOME", "cache"),
+        ("XDG_RUNTIME_DIR", "run"),
+    ]:
+        (tmp_path / sub).mkdir()
+        monkeypatch.setenv(name, str(tmp_path / sub))
+    monkeypatch.delenv("HYPRLAND_INSTANCE_SIGNATURE", raising=False)
+
+    image = Image.new("RGB", (320, 180), (40, 90, 160))
+    image.paste((220, 140, 60), (0, 0, 160, 180))
+    path = tmp_path / "wall.png"
+    image.save(path)
+    return path
+
+
+def test_image_verbose(wallpaper, capsys):
+    assert main.main(["image", str(wallpaper), "-v", "--no-hooks", "--no-cache"]) == 0
+
+    out = capsys.readouterr().out
+    assert "Primary: #" in out
+    assert "Rendered " in out
+
+
+def test_apply_verbose(wallpaper, tmp_path, capsys):
+    argv = ["apply", str(wallpaper), "-v", "--no-hooks", "--no-cache"]
+    assert main.main(argv + ["-o", str(tmp_path / "widgets.json")]) == 0
+
+    assert "Primary: #" in capsys.readouterr().out
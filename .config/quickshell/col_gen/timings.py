@@ -0,0 +1,156 @@
+"""
+Lightweight per-stage timers and counters (--timings, --profile).
+
+Stages wrap their work in span():
+
+    with span("seed.quantize"):
+        quantized = QuantizeCelebi(pixels, 128)
+
+and record cache outcomes with count("cache.entry.hit"). Nothing is
+recorded unless enable() was called, so instrumented code costs a
+function call when timings are off. Spans with the same name are
+aggregated. CPU time is per thread (time.thread_time), so spans in hook or
+writer threads report their own CPU. Work done in child processes (batch
+and preview worker pools) is not included.
+
+Peak RSS is the process's lifetime high-water mark (ru_maxrss), not the
+memory a single run needed. The daemon answers many requests from one
+process, so it calls without_peak_rss() and its reports leave the figure
+out.
+"""
+
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_enabled = False
+_started = (0.0, 0.0)
+# name -> [calls, wall seconds, cpu seconds, peak RSS KiB at span end]
+_spans: dict[str, list] = {}
+_counters: dict[str, int] = {}
+_peak_rss = True
+
+
+def enable() -> None:
+    """Start recording, discarding anything from a previous run."""
+    global _enabled, _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _started = (time.perf_counter(), time.process_time())
+        _enabled = True
+
+
+def disable() -> None:
+    """Stop recording."""
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def without_peak_rss() -> None:
+    """Leave peak RSS out of reports (long-running processes, see above)."""
+    global _peak_rss
+    _peak_rss = False
+
+
+def peak_rss_kib() -> int:
+    """High-water resident set size of this process in KiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block under name (wall, thread CPU, peak RSS)."""
+    if not _enabled:
+        yield
+        return
+
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.thread_time() - cpu
+        rss = peak_rss_kib() if _peak_rss else 0
+        with _lock:
+            entry = _spans.setdefault(name, [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+            entry[3] = max(entry[3], rss)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter (e.g. "cache.entry.hit")."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def report() -> dict:
+    """
+    Summarize the run so far.
+
+    Returns:
+        {"wall_ms", "cpu_ms", "peak_rss_mib",
+         "spans": [{"name", "calls", "wall_ms", "cpu_ms", "peak_rss_mib"}],
+         "counters": {name: n}}
+        with every peak_rss_mib None after without_peak_rss()
+    """
+    wall, cpu = _started
+    with _lock:
+        spans = [
+            {
+                "name": name,
+                "calls": calls,
+                "wall_ms": round(span_wall * 1000, 3),
+                "cpu_ms": round(span_cpu * 1000, 3),
+                "peak_rss_mib": round(rss / 1024, 1) if _peak_rss else None,
+            }
+            for name, (calls, span_wall, span_cpu, rss) in _spans.items()
+        ]
+        counters = dict(sorted(_counters.items()))
+
+    return {
+        "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+        "cpu_ms": round((time.process_time() - cpu) * 1000, 3),
+        "peak_rss_mib": round(peak_rss_kib() / 1024, 1) if _peak_rss else None,
+        "spans": spans,
+        "counters": counters,
+    }
+
+
+def print_report(data: dict, fmt: str = "text", file=None) -> None:
+    """Print a report() dict as compact JSON or an aligned table (stderr by default)."""
+    import json
+
+    file = file or sys.stderr
+    if fmt == "json":
+        print(json.dumps(data, separators=(",", ":")), file=file)
+        return
+
+    def rss(mib: float | None) -> str:
+        return f"{'-':>8}" if mib is None else f"{mib:8.1f}"
+
+    print(f"{'stage':<24} {'calls':>5} {'wall ms':>9} {'cpu ms':>9} {'rss MiB':>8}", file=file)
+    for s in data["spans"]:
+        print(
+            f"{s['name']:<24} {s['calls']:5} {s['wall_ms']:9.1f} "
+            f"{s['cpu_ms']:9.1f} {rss(s['peak_rss_mib'])}",
+            file=file,
+        )
+    print(
+        f"{'total':<24} {'':5} {data['wall_ms']:9.1f} {data['cpu_ms']:9.1f} "
+        f"{rss(data['peak_rss_mib'])}",
+        file=file,
+    )
+    for name, n in data["counters"].items():
+        print(f"{name}: {n}", file=file)
@@ -0,0 +1,198 @@
+"""
+File change notification for `col_gen watch`.
+
+Watchers report which of the watched files changed. The inotify watcher
+blocks in the kernel until something happens, so an idle watch costs
+nothing; where inotify is unavailable a polling watcher compares mtimes
+and sizes every poll interval instead.
+
+    watcher = open_watcher()
+    watcher.watch(TEMPLATES_DIR)                       # every file in it
+    watcher.watch(wallpaper.parent, {wallpaper.name})  # just these names
+    for changed in debounced(watcher, 0.3):
+        ...                                            # set of Paths
+
+Standard library only (inotify through ctypes).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# inotify(7) event bits: files written and closed, renamed into place,
+# created or deleted
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_IGNORED = 0x8000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class InotifyWatcher:
+    """Watches directories with inotify, filtered to the requested names."""
+
+    kind = "inotify"
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> (directory, names or None for all)
+        self._watches: dict[int, tuple[Path, set[str] | None]] = {}
+
+    def watch(self, directory: str | Path, names: set[str] | None = None) -> None:
+        """Report changes of names in directory (every file if names is None)."""
+        directory = Path(directory)
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        # Watching the same directory again returns the same descriptor
+        if wd in self._watches:
+            known = self._watches[wd][1]
+            names = None if known is None or names is None else known | set(names)
+        self._watches[wd] = (directory, None if names is None else set(names))
+
+    def unwatch(self, directory: str | Path) -> None:
+        directory = Path(directory)
+        for wd, (watched, _) in list(self._watches.items()):
+            if watched == directory:
+                self._rm_watch(self.fd, wd)
+                del self._watches[wd]
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """
+        Block until watched files change or timeout seconds pass.
+
+        Returns:
+            Changed paths (empty on timeout)
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+
+            if mask & IN_IGNORED or wd not in self._watches:
+                continue
+            directory, names = self._watches[wd]
+            if name and (names is None or name in names):
+                changed.add(directory / name)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Compares (mtime, size) of the watched files every interval seconds."""
+
+    kind = "polling"
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        self._watches: dict[Path, set[str] | None] = {}
+        self._state: dict[Path, tuple[int, int] | None] = {}
+
+    def watch(self, directory: str | Path, names: set[str] | None = None) -> None:
+        directory = Path(directory)
+        if directory in self._watches:
+            known = self._watches[directory]
+            names = None if known is None or names is None else known | set(names)
+        self._watches[directory] = None if names is None else set(names)
+        self._state.update(self._snapshot())
+
+    def unwatch(self, directory: str | Path) -> None:
+        self._watches.pop(Path(directory), None)
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int] | None]:
+        state = {}
+        for directory, names in self._watches.items():
+            if names is None:
+                try:
+                    paths = [directory / name for name in os.listdir(directory)]
+                except OSError:
+                    paths = []
+            else:
+                paths = [directory / name for name in names]
+            for path in paths:
+                try:
+                    st = path.stat()
+                    state[path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    state[path] = None
+        return state
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._snapshot()
+            changed = {
+                path
+                for path in state.keys() | self._state.keys()
+                if state.get(path) != self._state.get(path)
+            }
+            self._state = state
+            if changed:
+                return changed
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(
+    poll_interval: float = DEFAULT_POLL_INTERVAL, polling: bool = False
+) -> InotifyWatcher | PollingWatcher:
+    """An inotify watcher, or a polling one if inotify is unavailable (or polling)."""
+    if not polling:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(poll_interval)
+
+
+def debounced(watcher, delay: float = DEFAULT_DEBOUNCE):
+    """
+    Yield sets of changed paths, each once no further change arrived for
+    delay seconds, so bursts (an editor's write + rename, a copy in
+    progress) are handled once.
+    """
+    while True:
+        changed = watcher.wait()
+        while more := watcher.wait(delay):
+            changed |= more
+        yield changed
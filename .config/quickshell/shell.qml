@@ -105,6 +105,8 @@ ShellRoot {
 	FileView {
 	    id: colorWatcher
 	    path: Qt.resolvedUrl("./Colors.json")
+	    // Still watched with col_gen pushing updates (below): catches pushes
+	    // that failed and writes from anything else
 	    watchChanges: true
 	    onFileChanged: reload()
 
@@ -161,6 +163,29 @@ ShellRoot {
 	    }
 	}
 
+	// Color updates pushed by col_gen (col_gen/publish.py): one JSON line
+	// per theme change, carrying the changed Colors.json keys
+	SocketServer {
+	    readonly property string runtimeDir: Quickshell.env("XDG_RUNTIME_DIR") || ""
+	    active: runtimeDir !== ""
+	    path: runtimeDir + "/col_gen.sub.shell.sock"
+	    handler: Socket {
+	        parser: SplitParser {
+	            onRead: line => {
+	                try {
+	                    const update = JSON.parse(line)
+	                    if (update.type !== "colors") return
+	                    for (const key of update.changed) {
+	                        if (key in update.colors) col[key] = update.colors[key]
+	                    }
+	                } catch (e) {
+	                    console.warn("col_gen: invalid color update:", e)
+	                }
+	            }
+	        }
+	    }
+	}
+
 	// Sync dndEnabled between cfg and Gstate (cfg is not accessible in Singletons)
 	Binding { target: Gstate; property: "dndEnabled"; value: cfg.dndEnabled }
 	Connections {